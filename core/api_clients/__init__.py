@@ -12,9 +12,11 @@
 - ComfyUI 格式 (本地ComfyUI工作流)
 """
 
-from typing import Dict, Any, Tuple, Optional
+import asyncio
+from collections.abc import Mapping
+from typing import Dict, Any, Coroutine, Tuple, Optional
 
-from .base_client import BaseApiClient
+from .base_client import BaseApiClient, logger
 from .openai_client import OpenAIClient
 from .openai_chat_client import OpenAIChatClient
 from .doubao_client import DoubaoClient
@@ -39,6 +41,8 @@ __all__ = [
     'ApiClient',
     'get_client_class',
     'generate_image_standalone',
+    'run_coalesced_txt2img',
+    'txt2img_coalesce_key',
 ]
 
 
@@ -68,6 +72,49 @@ def get_client_class(api_format: str):
     return CLIENT_MAPPING.get(api_format.lower(), OpenAIClient)
 
 
+# 进行中的文生图请求：群聊短时间内参数完全相同的请求共享同一次 API 调用结果
+_INFLIGHT_TXT2IMG: Dict[Tuple[Any, ...], "asyncio.Future[Tuple[bool, str]]"] = {}
+
+
+def _freeze_config_value(value: Any) -> Any:
+    """把配置值递归转换为可哈希的形式（dict、ChainMap 等映射按键排序，list 转为 tuple）"""
+    if isinstance(value, Mapping):
+        return tuple(sorted((str(k), _freeze_config_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze_config_value(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def txt2img_coalesce_key(model_config: Dict[str, Any], size: str, prompt: str) -> Tuple[Any, ...]:
+    """构造文生图请求的合并键
+
+    包含完整的模型配置（种子、步数、附加提示词、预设、密钥等都会影响结果），
+    只有配置、尺寸与提示词完全相同的请求才视为同一请求。
+    """
+    return (_freeze_config_value(model_config), size, prompt)
+
+
+async def run_coalesced_txt2img(
+    key: Tuple[Any, ...], generate_coro: Coroutine[Any, Any, Any], log_prefix: str = ""
+) -> Tuple[bool, str]:
+    """执行文生图请求；已有相同参数的请求在进行中时直接等待其结果"""
+    pending = _INFLIGHT_TXT2IMG.get(key)
+    if pending is not None:
+        generate_coro.close()
+        logger.info("%s 合并相同参数的并发文生图请求", log_prefix)
+        return await asyncio.shield(pending)
+
+    task = asyncio.ensure_future(generate_coro)
+    _INFLIGHT_TXT2IMG[key] = task
+    task.add_done_callback(lambda _: _INFLIGHT_TXT2IMG.pop(key, None))
+    # shield：发起方被取消时，不影响正在等待同一结果的其他请求
+    return await asyncio.shield(task)
+
+
 class ApiClient:
     """统一的API客户端包装类
 
@@ -1,6 +1,7 @@
 """API客户端基类"""
 
 import asyncio
+import threading
 from typing import Dict, Any, Tuple, Optional
 from src.common.logger import get_logger
 
@@ -22,6 +23,20 @@ def get_requests_module() -> Any:
     return requests
 
 
+# 每个工作线程一个 requests.Session：同步请求在 asyncio.to_thread 的线程池中执行，
+# 线程内复用 Session 即可保持 HTTP keep-alive 连接，同时避免多线程共享同一个 Session
+_thread_local = threading.local()
+
+
+def get_requests_session() -> Any:
+    """获取当前线程复用的 requests.Session（依赖缺失时抛出 NonRetryableError）"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = get_requests_module().Session()
+        _thread_local.session = session
+    return session
+
+
 class BaseApiClient:
     """API客户端基类"""
 
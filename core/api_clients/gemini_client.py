@@ -2,7 +2,7 @@
 import json
 from typing import Dict, Any, Tuple, Optional
 
-from .base_client import BaseApiClient, logger, get_requests_module
+from .base_client import BaseApiClient, logger, get_requests_session
 from ..utils import pixel_size_to_gemini_aspect
 
 
@@ -20,7 +20,7 @@ class GeminiClient(BaseApiClient):
         input_image_base64: Optional[str] = None
     ) -> Tuple[bool, str]:
         """发送Gemini格式的HTTP请求生成图片"""
-        requests = get_requests_module()
+        http = get_requests_session()
         try:
             # API配置
             api_key = model_config.get("api_key", "").replace("Bearer ", "")
@@ -102,7 +102,7 @@ class GeminiClient(BaseApiClient):
                 }
 
             # 发送请求
-            response = requests.post(**request_kwargs)
+            response = http.post(**request_kwargs)
 
             if response.status_code != 200:
                 error_msg = response.text
@@ -7,7 +7,7 @@ import json
 import base64
 from typing import Dict, Any, Tuple, Optional
 
-from .base_client import BaseApiClient, logger, get_requests_module
+from .base_client import BaseApiClient, logger, get_requests_session
 from ..utils import parse_pixel_size
 
 
@@ -25,7 +25,7 @@ class MengyuaiClient(BaseApiClient):
         input_image_base64: Optional[str] = None,
     ) -> Tuple[bool, str]:
         """发送梦羽AI格式的HTTP请求生成图片"""
-        requests = get_requests_module()
+        http = get_requests_session()
         try:
             # API配置
             base_url = model_config.get("base_url", "https://sd.exacg.cc").rstrip('/')
@@ -113,7 +113,7 @@ class MengyuaiClient(BaseApiClient):
                 }
 
             # 发送请求
-            response = requests.post(**request_kwargs)
+            response = http.post(**request_kwargs)
 
             if response.status_code != 200:
                 error_msg = response.text
@@ -214,7 +214,7 @@ class MengyuaiClient(BaseApiClient):
         Returns:
             图片的base64编码，失败返回空字符串
         """
-        requests = get_requests_module()
+        http = get_requests_session()
         try:
             request_kwargs = {"url": url, "timeout": 30}
 
@@ -224,7 +224,7 @@ class MengyuaiClient(BaseApiClient):
                     "https": proxy_config["https"]
                 }
 
-            response = requests.get(**request_kwargs)
+            response = http.get(**request_kwargs)
 
             if response.status_code == 200:
                 return base64.b64encode(response.content).decode('utf-8')
@@ -245,7 +245,7 @@ class MengyuaiClient(BaseApiClient):
         Returns:
             图片URL，失败返回空字符串
         """
-        requests = get_requests_module()
+        http = get_requests_session()
         try:
             # 将base64转为bytes
             image_bytes = base64.b64decode(self._get_clean_base64(image_base64))
@@ -258,7 +258,7 @@ class MengyuaiClient(BaseApiClient):
                 "file": ("image.png", image_bytes, "image/png")
             }
 
-            response = requests.post(upload_url, headers=headers, files=files, timeout=30)
+            response = http.post(upload_url, headers=headers, files=files, timeout=30)
 
             if response.status_code == 200:
                 result = response.json()
@@ -5,7 +5,7 @@ import time
 import base64
 from typing import Dict, Any, Tuple, Optional
 
-from .base_client import BaseApiClient, logger, get_requests_module
+from .base_client import BaseApiClient, logger, get_requests_session
 
 
 class ModelscopeClient(BaseApiClient):
@@ -22,7 +22,7 @@ class ModelscopeClient(BaseApiClient):
         input_image_base64: Optional[str] = None,
     ) -> Tuple[bool, str]:
         """发送魔搭格式的HTTP请求生成图片"""
-        requests = get_requests_module()
+        http = get_requests_session()
         try:
             # API配置
             api_key = model_config.get("api_key", "").replace("Bearer ", "")
@@ -86,7 +86,7 @@ class ModelscopeClient(BaseApiClient):
                 request_kwargs["proxies"] = {"http": proxy_config["http"], "https": proxy_config["https"]}
 
             # 发送异步请求
-            response = requests.post(**request_kwargs)
+            response = http.post(**request_kwargs)
 
             if response.status_code != 200:
                 error_msg = response.text
@@ -118,7 +118,7 @@ class ModelscopeClient(BaseApiClient):
                     if proxy_config:
                         check_kwargs["proxies"] = {"http": proxy_config["http"], "https": proxy_config["https"]}
 
-                    check_response = requests.get(**check_kwargs)
+                    check_response = http.get(**check_kwargs)
 
                     if check_response.status_code != 200:
                         logger.warning(f"{self.log_prefix} (魔搭) 状态检查失败: HTTP {check_response.status_code}")
@@ -140,7 +140,7 @@ class ModelscopeClient(BaseApiClient):
                                         "https": proxy_config["https"],
                                     }
 
-                                img_response = requests.get(**img_kwargs)
+                                img_response = http.get(**img_kwargs)
                                 if img_response.status_code == 200:
                                     image_base64 = base64.b64encode(img_response.content).decode("utf-8")
                                     logger.info(f"{self.log_prefix} (魔搭) 图片生成成功")
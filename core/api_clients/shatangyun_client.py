@@ -8,7 +8,7 @@ import base64
 from typing import Dict, Any, Tuple, Optional
 from urllib.parse import urlencode
 
-from .base_client import BaseApiClient, logger, get_requests_module
+from .base_client import BaseApiClient, logger, get_requests_session
 
 
 class ShatangyunClient(BaseApiClient):
@@ -25,7 +25,7 @@ class ShatangyunClient(BaseApiClient):
         input_image_base64: Optional[str] = None,
     ) -> Tuple[bool, str]:
         """发送砂糖云格式的HTTP请求生成图片"""
-        requests = get_requests_module()
+        http = get_requests_session()
         try:
             # API配置
             base_url = model_config.get("base_url", "https://std.loliyc.com").rstrip('/')
@@ -90,7 +90,7 @@ class ShatangyunClient(BaseApiClient):
                 }
 
             # 发送GET请求获取图片
-            response = requests.get(**request_kwargs)
+            response = http.get(**request_kwargs)
 
             if response.status_code != 200:
                 logger.error(f"{self.log_prefix} (砂糖云) 请求失败: HTTP {response.status_code}")
@@ -1,7 +1,16 @@
+import asyncio
 import base64
+import functools
 import os
+import random
+import re
 import time as time_module
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, Iterable, Sequence
+
+try:
+    import pybase64 as _b64  # 可选依赖：SIMD 加速的 base64 实现
+except ImportError:
+    _b64 = base64  # type: ignore[assignment]
 
 from src.plugin_system.base.base_action import BaseAction  # pyright: ignore[reportMissingImports]
 from src.plugin_system.base.component_types import (  # pyright: ignore[reportMissingImports]
@@ -10,7 +19,7 @@ from src.plugin_system.base.component_types import (  # pyright: ignore[reportMi
 )
 from src.common.logger import get_logger  # pyright: ignore[reportMissingImports]
 
-from .api_clients import get_client_class
+from .api_clients import get_client_class, run_coalesced_txt2img, txt2img_coalesce_key
 from .utils import (
     ImageProcessor,
     CacheManager,
@@ -24,7 +33,9 @@ from .utils import (
     get_model_config,
     merge_negative_prompt,
     inject_llm_original_size,
+    is_placeholder_api_key,
     resolve_image_data,
+    extract_sent_message_id,
     schedule_auto_recall,
     optimize_prompt,
     normalize_selfie_style,
@@ -34,6 +45,216 @@ from .utils import (
 
 logger = get_logger("selfie_painter")
 
+# 去重键只需大小写一致，仅转换 ASCII 字母即可（比 str.lower 的 Unicode 处理更快，中文原样保留）
+_ASCII_LOWER_TBL = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _split_prompt_keywords(fragment: str) -> list[Tuple[str, str]]:
+    """把逗号分隔的提示词片段拆成 (原文, 去重键) 列表，去重键为 ASCII 小写形式。"""
+    keywords: list[Tuple[str, str]] = []
+    for kw in fragment.split(","):
+        kw = kw.strip()
+        if kw:
+            keywords.append((kw, kw.translate(_ASCII_LOWER_TBL)))
+    return keywords
+
+
+def _add_unique_keywords(prompt_keywords: Dict[str, str], keywords: Iterable[Tuple[str, str]]) -> None:
+    """把 (原文, 去重键) 按插入顺序写入 {去重键: 原文}，保留首次出现的原文。"""
+    setdefault = prompt_keywords.setdefault
+    for kw, key in keywords:
+        setdefault(key, kw)
+
+
+# 自拍场景固定片段：模块加载时预先拆分并计算去重键，避免每次生成时重复计算
+_MIRROR_SCENE_KEYWORDS: Tuple[Tuple[str, str], ...] = tuple(
+    _split_prompt_keywords(
+        "(mirror selfie:1.4), standing in front of large mirror, "
+        "full body reflection in mirror, mirror frame visible, "
+        "indoor scene"
+    )
+)
+# 标准自拍（无手部动作时）的场景
+_STANDARD_SCENE_KEYWORDS: Tuple[Tuple[str, str], ...] = tuple(
+    _split_prompt_keywords("(selfie:1.4), close-up, looking at viewer, two hands only")
+)
+# 标准自拍（有手部动作时）的统一模板：伸手向镜头 + 另一手做动作 + 两手可见
+_STANDARD_SCENE_HEAD_KEYWORDS: Tuple[Tuple[str, str], ...] = tuple(
+    _split_prompt_keywords(
+        "(selfie:1.4), looking at viewer, one arm extended forward towards camera and hand out of frame"
+    )
+)
+_STANDARD_SCENE_TAIL_KEYWORDS: Tuple[Tuple[str, str], ...] = tuple(_split_prompt_keywords("two hands only"))
+
+# 按自拍风格索引的固定场景片段
+_SELFIE_SCENE_KEYWORDS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    # 对镜自拍风格：全身反射，明确镜前空间关系，避免镜子变传送门
+    "mirror": _MIRROR_SCENE_KEYWORDS,
+    # 第三人称照片风格：不加任何固定场景约束，完全由角色外观+LLM动作/环境决定构图
+    "photo": (),
+    "standard": _STANDARD_SCENE_KEYWORDS,
+}
+
+# standard 自拍需过滤的手机类词汇（LLM 返回的手部动作可能包含）
+_PHONE_KEYWORD_PATTERN = re.compile(r"\b(phone|smartphone|mobile|device)\b", re.IGNORECASE)
+# 上述正则的子串预检（smartphone 已包含 phone）
+_PHONE_KEYWORD_HINTS = ("phone", "mobile", "device")
+
+# ---- 风格专用手部动作池 ----
+# standard: 一只手举手机（画面外），只有另一只手空闲，仅单手动作
+_STANDARD_HAND_ACTIONS: Tuple[str, ...] = (
+    "peace sign, v sign",
+    "waving hand, friendly gesture",
+    "thumbs up, positive gesture",
+    "single hand heart gesture, cute gesture",
+    "touching cheek gently, soft expression",
+    "hand near chin, thinking pose",
+    "one hand playing with hair, casual",
+    "hand on hip, confident pose",
+    "adjusting hair, elegant gesture",
+    "resting chin on hand, relaxed",
+    "finger on lips, secretive",
+    "hand on chest, gentle",
+    "tucking hair behind ear, elegant",
+    "touching necklace, delicate gesture",
+    "hand near eye level, cute gesture",
+    "cat paw gesture, playful",
+    "saluting, playful military pose",
+    "hand covering mouth slightly, shy smile",
+    "blowing kiss, romantic",
+    "index finger pointing up, idea pose",
+    "hand cupping own cheek, adorable",
+    "hand resting on collarbone, graceful",
+    "pinching own cheek, playful",
+)
+
+# mirror: 一只手拿手机对着镜子拍（画面内可见），另一只手空闲，全身或半身
+_MIRROR_HAND_ACTIONS: Tuple[str, ...] = (
+    "hand on hip, confident pose",
+    "hand in hair, adjusting hairstyle",
+    "hand on waist, model pose",
+    "fixing collar, neat appearance",
+    "adjusting earring, elegant detail",
+    "hand touching shoulder, graceful",
+    "hand behind head, relaxed pose",
+    "one hand on thigh, standing pose",
+    "hand resting at side, natural",
+    "hand lightly touching mirror, playful",
+    "fixing skirt, adjusting outfit",
+    "hand on bag strap, casual",
+    "brushing bangs aside, stylish",
+    "hand in pocket, cool pose",
+    "hand on chin, thoughtful pose",
+    "adjusting glasses, intellectual",
+    "checking watch, elegant gesture",
+    "holding strand of hair, delicate",
+    "hand near face, model pose",
+    "touching hat brim, fashionable",
+)
+
+# photo: 他人拍摄视角，双手都自由，可以有更自然丰富的全身姿态
+_PHOTO_HAND_ACTIONS: Tuple[str, ...] = (
+    "hands behind back, standing gracefully",
+    "hands in pockets, casual walk",
+    "one hand in hair wind blowing, dynamic",
+    "arms at sides, natural standing",
+    "holding coffee cup, cafe scene",
+    "hands clasped in front, gentle pose",
+    "holding bag, walking pose",
+    "leaning on railing, one hand resting",
+    "sitting with hands on lap, relaxed",
+    "hand on hat, windy day",
+    "twirling, arms slightly out, dynamic spin",
+    "arms stretched out, embracing scenery",
+    "holding flower, smelling gently",
+    "hand shielding eyes from sun, looking afar",
+    "carrying shopping bags, casual walk",
+    "holding book to chest, scholarly",
+    "one hand waving at camera, candid",
+    "both hands holding drink, warm gesture",
+    "hands on knees, sitting pose",
+    "leaning against wall, arms relaxed",
+    "crouching down, hands on knees, playful angle",
+    "running toward camera, joyful",
+    "holding umbrella, rainy atmosphere",
+    "hand reaching out toward camera, inviting",
+    "sitting on bench, legs crossed, elegant",
+)
+
+_HAND_ACTIONS_BY_STYLE: Dict[str, Tuple[str, ...]] = {
+    "standard": _STANDARD_HAND_ACTIONS,
+    "mirror": _MIRROR_HAND_ACTIONS,
+    "photo": _PHOTO_HAND_ACTIONS,
+}
+
+# 从消息中提取描述时移除的字面前缀/后缀（按长度降序，较长的候选优先匹配）
+_DESCRIPTION_PREFIXES: Tuple[str, ...] = tuple(
+    sorted(
+        ("画", "绘制", "生成图片", "画图", "帮我画", "请画", "能不能画", "可以画",
+         "画一个", "画一只", "画张", "画幅", "图：", "图:"),
+        key=len,
+        reverse=True,
+    )
+)
+_DESCRIPTION_SUFFIXES: Tuple[str, ...] = ("图片", "一下", "图", "呗", "吧")
+# 描述首尾需要去除的空白（含全角空格）与冒号（全角/半角），一次 str.strip 完成
+_DESCRIPTION_STRIP_CHARS = " \t\r\n\u3000：:"
+# 提取描述的最终长度上限，以及清理前的截断长度
+_DESCRIPTION_MAX_LENGTH = 100
+_DESCRIPTION_SCAN_LIMIT = _DESCRIPTION_MAX_LENGTH * 2
+# "用模型3" / "用 model abc" 这类指定模型的前缀不是字面量，仍用正则处理
+_DESCRIPTION_MODEL_PREFIX_PATTERN = re.compile(r"^用\s*(?:模型|model)\s*\S+\s*", re.IGNORECASE)
+
+
+def _strip_description_affixes(text: str) -> str:
+    """去除描述开头的一个画图前缀（及可选的"用模型X"）和结尾的一个语气后缀
+
+    前后缀各只去除一次："画画家"、"画画眉鸟"中的第二个"画"以及"地图"中的"图"属于描述本身。
+    """
+    text = text.lstrip(_DESCRIPTION_STRIP_CHARS)
+    for prefix in _DESCRIPTION_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix) :].lstrip(_DESCRIPTION_STRIP_CHARS)
+            break
+    if text.startswith("用"):
+        text = _DESCRIPTION_MODEL_PREFIX_PATTERN.sub("", text, count=1)
+
+    for suffix in _DESCRIPTION_SUFFIXES:
+        if text.endswith(suffix):
+            return text[: -len(suffix)]
+    return text
+
+
+# 插件根目录（相对路径配置均相对于此目录解析）
+_PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置缺失哨兵：区分"配置不存在"和"配置值为 None"
+_CONFIG_MISSING = object()
+
+# 参考图分块读取大小（3 的倍数，分块 base64 编码时不会产生中间填充）
+_B64_READ_CHUNK_SIZE = 65535 * 3
+
+
+def _encode_file_base64(image_path: str) -> bytearray:
+    """读取文件并编码为 base64 的 ASCII 字节（需要 bytes 请求体的调用方可直接使用，无需先解码为 str）"""
+    # 分块编码：块大小为 3 的倍数，拼接结果与整体编码一致，避免同时持有整份原图和编码结果
+    # 读取复用同一块缓冲区（readinto + memoryview），不为每个分块分配新的 bytes
+    # buffering=0 直接使用原始 FileIO，省去 BufferedReader 包装层及其内部缓冲区的二次拷贝
+    chunk = bytearray(_B64_READ_CHUNK_SIZE)
+    view = memoryview(chunk)
+    buf = bytearray()
+    with open(image_path, "rb", buffering=0) as f:
+        while n := f.readinto(chunk):
+            buf += _b64.b64encode(view[:n])
+    return buf
+
+
+@functools.lru_cache(maxsize=4)
+def _load_reference_image_base64(image_path: str, mtime_ns: int, size: int) -> str:
+    """读取参考图并返回 base64 字符串（mtime_ns/size 仅作为缓存键，文件修改后自动失效）"""
+    # 各 API 客户端都把图片嵌入 JSON 请求体，只缓存 str 形式，不额外保留一份 bytes
+    return _encode_file_base64(image_path).decode("ascii")
+
 
 class SelfiePainterAction(BaseAction):
     """统一的图片生成动作，智能检测文生图或图生图"""
@@ -156,6 +377,16 @@ class SelfiePainterAction(BaseAction):
         self.image_processor = ImageProcessor(self)
         self.cache_manager = CacheManager(self)
         self._api_clients = {}  # 缓存不同格式的API客户端
+        self._config_cache: Dict[str, Any] = {}  # 单次 execute 内的配置读取缓存
+        self._model_config_cache: Dict[str, Dict[str, Any]] = {}  # 单次 execute 内的模型配置缓存
+
+    def get_config(self, key: str, default: Any = None) -> Any:
+        """读取配置（同一次 execute 内按键缓存，避免热路径上重复遍历配置字典）"""
+        value = self._config_cache.get(key, _CONFIG_MISSING)
+        if value is _CONFIG_MISSING:
+            value = super().get_config(key, _CONFIG_MISSING)
+            self._config_cache[key] = value
+        return default if value is _CONFIG_MISSING else value
 
     def _get_prompt_optimizer_timing(self) -> str:
         """获取提示词优化器执行时机。"""
@@ -171,7 +402,7 @@ class SelfiePainterAction(BaseAction):
     ) -> str:
         """按当前配置优化提示词，失败时回退原文。"""
         mode_label = "规范化提示词" if normalize_mode else ("场景提示词" if scene_only else "提示词")
-        logger.info(f"{self.log_prefix} 开始优化{mode_label}: {description[:50]}...")
+        logger.info("%s 开始优化%s: %s...", self.log_prefix, mode_label, description[:50])
         custom_base_url: str = str(self.get_config("prompt_optimizer.custom_api_base_url", ""))
         custom_api_key: str = str(self.get_config("prompt_optimizer.custom_api_key", ""))
         custom_model: str = str(self.get_config("prompt_optimizer.custom_api_model", ""))
@@ -186,10 +417,10 @@ class SelfiePainterAction(BaseAction):
             custom_api_model=custom_model,
         )
         if success:
-            logger.info(f"{self.log_prefix} {mode_label}优化完成: {optimized_prompt[:80]}...")
+            logger.info("%s %s优化完成: %s...", self.log_prefix, mode_label, optimized_prompt[:80])
             return optimized_prompt
 
-        logger.warning(f"{self.log_prefix} {mode_label}优化失败，使用原始描述: {description[:50]}...")
+        logger.warning("%s %s优化失败，使用原始描述: %s...", self.log_prefix, mode_label, description[:50])
         return description
 
     def _get_api_client(self, api_format: str):
@@ -201,7 +432,10 @@ class SelfiePainterAction(BaseAction):
 
     async def execute(self) -> Tuple[bool, str]:
         """执行统一图片生成动作"""
-        logger.info(f"{self.log_prefix} 执行统一图片生成动作")
+        logger.info("%s 执行统一图片生成动作", self.log_prefix)
+        # 每次执行都重新读取配置，保证运行期修改的配置能生效
+        self._config_cache.clear()
+        self._model_config_cache.clear()
 
         # 懒启动自动自拍任务（如果插件初始化时事件循环未就绪）
         try:
@@ -213,19 +447,19 @@ class SelfiePainterAction(BaseAction):
                 if callable(startup_handler):
                     startup_handler()
         except (ImportError, AttributeError, RuntimeError) as exc:
-            logger.debug(f"{self.log_prefix} 自动自拍懒启动检查失败（将忽略）: {exc}")
+            logger.debug("%s 自动自拍懒启动检查失败（将忽略）: %s", self.log_prefix, exc)
 
         # 检查是否是 /dr 命令消息，如果是则跳过（由 Command 组件处理）
         if self.action_message and self.action_message.processed_plain_text:
             message_text = self.action_message.processed_plain_text.strip()
             if message_text.startswith("/dr ") or message_text == "/dr":
-                logger.info(f"{self.log_prefix} 检测到 /dr 命令，跳过 Action 处理（由 Command 组件处理）")
+                logger.info("%s 检测到 /dr 命令，跳过 Action 处理（由 Command 组件处理）", self.log_prefix)
                 return False, "跳过 /dr 命令"
 
         # 检查插件是否在当前聊天流启用
         global_enabled: bool = bool(self.get_config("plugin.enabled", True))
         if not runtime_state.is_plugin_enabled(self.chat_id, global_enabled):
-            logger.info(f"{self.log_prefix} 插件在当前聊天流已禁用")
+            logger.info("%s 插件在当前聊天流已禁用", self.log_prefix)
             return False, "插件已禁用"
 
         # 获取参数
@@ -258,12 +492,12 @@ class SelfiePainterAction(BaseAction):
 
         # 检查模型是否在当前聊天流启用
         if not runtime_state.is_model_enabled(self.chat_id, model_id):
-            logger.warning(f"{self.log_prefix} 模型 {model_id} 在当前聊天流已禁用")
+            logger.warning("%s 模型 %s 在当前聊天流已禁用", self.log_prefix, model_id)
             await self.send_text(f"模型 {model_id} 当前不可用")
             return False, f"模型 {model_id} 已禁用"
 
         if not is_chat_allowed_for_model(self.get_config, self.chat_id, model_id):
-            logger.warning(f"{self.log_prefix} 模型 {model_id} 被聊天流访问规则拒绝: {self.chat_id}")
+            logger.warning("%s 模型 %s 被聊天流访问规则拒绝: %s", self.log_prefix, model_id, self.chat_id)
             await self.send_text(f"模型 {model_id} 当前聊天流不可用")
             return False, f"模型 {model_id} 被访问规则拒绝"
 
@@ -273,22 +507,33 @@ class SelfiePainterAction(BaseAction):
             extracted_description = self._extract_description_from_message()
             if extracted_description:
                 description = extracted_description
-                logger.info(f"{self.log_prefix} 从消息中提取到图片描述: {description}")
+                logger.info("%s 从消息中提取到图片描述: %s", self.log_prefix, description)
             else:
-                logger.warning(f"{self.log_prefix} 图片描述为空，无法生成图片。")
+                logger.warning("%s 图片描述为空，无法生成图片。", self.log_prefix)
                 await self.send_text("你需要告诉我想要画什么样的图片哦~ 比如说'画一只可爱的小猫'")
                 return False, "图片描述为空"
 
         # 清理和验证描述
         if len(description) > 1000:
             description = description[:1000]
-            logger.info(f"{self.log_prefix} 图片描述过长，已截断至1000字符")
+            logger.info("%s 图片描述过长，已截断至1000字符", self.log_prefix)
+
+        # 非自拍模式下提前在后台查找输入图片，与提示词优化的网络请求重叠执行
+        recent_image_task: Optional[asyncio.Task] = None
+        if not selfie_mode:
+            recent_image_task = asyncio.create_task(self.image_processor.get_recent_image())
 
         # 提示词优化（自拍模式仅优化场景/环境，不生成角色外观）
         optimizer_enabled: bool = bool(self.get_config("prompt_optimizer.enabled", True))
         optimizer_timing: str = self._get_prompt_optimizer_timing()
         if optimizer_enabled and optimizer_timing == "before":
-            description = await self._optimize_generation_prompt(description, scene_only=bool(selfie_mode))
+            try:
+                description = await self._optimize_generation_prompt(description, scene_only=bool(selfie_mode))
+            except BaseException:
+                # 优化失败或被取消时，不留下孤立的后台读图任务
+                if recent_image_task is not None:
+                    recent_image_task.cancel()
+                raise
 
         # 验证strength参数
         try:
@@ -307,7 +552,7 @@ class SelfiePainterAction(BaseAction):
                 await self.send_text("自拍功能暂未启用~")
                 return False, "自拍功能未启用"
 
-            logger.info(f"{self.log_prefix} 启用自拍模式，风格: {selfie_style}")
+            logger.info("%s 启用自拍模式，风格: %s", self.log_prefix, selfie_style)
 
             # 尝试获取日程活动信息（增强场景上下文）
             activity_scene = None
@@ -323,12 +568,12 @@ class SelfiePainterAction(BaseAction):
                     # 优先使用 LLM 生成场景，失败时回退到确定性映射
                     activity_scene = await generate_scene_with_llm(activity, selfie_style)
                     if activity_scene:
-                        logger.info(f"{self.log_prefix} LLM 生成日程场景: {activity.activity_type.value}")
+                        logger.info("%s LLM 生成日程场景: %s", self.log_prefix, activity.activity_type.value)
                     else:
                         activity_scene = get_action_for_activity(activity)
-                        logger.info(f"{self.log_prefix} LLM 失败，使用确定性映射: {activity.activity_type.value}")
+                        logger.info("%s LLM 失败，使用确定性映射: %s", self.log_prefix, activity.activity_type.value)
                 except Exception as e:
-                    logger.debug(f"{self.log_prefix} 获取日程活动失败（非必要）: {e}")
+                    logger.debug("%s 获取日程活动失败（非必要）: %s", self.log_prefix, e)
 
             description, selfie_negative_prompt = await self._process_selfie_prompt(
                 description, selfie_style, free_hand_action, model_id, activity_scene
@@ -350,7 +595,7 @@ class SelfiePainterAction(BaseAction):
                 # 检查模型是否支持图生图
                 model_config = self._get_model_config(model_id)
                 if model_config and model_config.get("support_img2img", True):
-                    logger.info(f"{self.log_prefix} 使用自拍参考图片进行图生图")
+                    logger.info("%s 使用自拍参考图片进行图生图", self.log_prefix)
                     return await self._execute_unified_generation(
                         description,
                         model_id,
@@ -360,24 +605,32 @@ class SelfiePainterAction(BaseAction):
                         extra_negative_prompt=selfie_negative_prompt,
                     )
                 else:
-                    logger.warning(f"{self.log_prefix} 模型 {model_id} 不支持图生图，自拍回退为文生图模式")
+                    logger.warning("%s 模型 %s 不支持图生图，自拍回退为文生图模式", self.log_prefix, model_id)
             # 无参考图或模型不支持，继续使用文生图（带负面提示词）
 
         # 收集自拍模式的额外负面提示词（如果启用了自拍模式）
         extra_neg = selfie_negative_prompt if selfie_mode else None
 
         if optimizer_enabled and optimizer_timing == "after" and not selfie_mode:
-            description = await self._optimize_generation_prompt(description, scene_only=False)
+            try:
+                description = await self._optimize_generation_prompt(description, scene_only=False)
+            except BaseException:
+                if recent_image_task is not None:
+                    recent_image_task.cancel()
+                raise
 
         # **智能检测：判断是文生图还是图生图**
-        input_image_base64 = await self.image_processor.get_recent_image()
+        if recent_image_task is not None:
+            input_image_base64 = await recent_image_task
+        else:
+            input_image_base64 = await self.image_processor.get_recent_image()
         is_img2img_mode = input_image_base64 is not None
 
         if is_img2img_mode:
             # 检查指定模型是否支持图生图
             model_config = self._get_model_config(model_id)
             if model_config and not model_config.get("support_img2img", True):
-                logger.warning(f"{self.log_prefix} 模型 {model_id} 不支持图生图，转为文生图模式")
+                logger.warning("%s 模型 %s 不支持图生图，转为文生图模式", self.log_prefix, model_id)
                 await self.send_text(f"当前模型 {model_id} 不支持图生图功能，将为您生成新图片")
                 return await self._execute_unified_generation(
                     description,
@@ -388,7 +641,7 @@ class SelfiePainterAction(BaseAction):
                     extra_negative_prompt=extra_neg,
                 )
 
-            logger.info(f"{self.log_prefix} 检测到输入图片，使用图生图模式")
+            logger.info("%s 检测到输入图片，使用图生图模式", self.log_prefix)
             return await self._execute_unified_generation(
                 description,
                 model_id,
@@ -398,7 +651,7 @@ class SelfiePainterAction(BaseAction):
                 extra_negative_prompt=extra_neg,
             )
         else:
-            logger.info(f"{self.log_prefix} 未检测到输入图片，使用文生图模式")
+            logger.info("%s 未检测到输入图片，使用文生图模式", self.log_prefix)
             return await self._execute_unified_generation(
                 description,
                 model_id,
@@ -429,7 +682,7 @@ class SelfiePainterAction(BaseAction):
         if not model_config:
             error_msg = f"指定的模型 '{model_id}' 不存在或配置无效，请检查配置文件。"
             await self.send_text(error_msg)
-            logger.error(f"{self.log_prefix} 模型配置获取失败: {model_id}")
+            logger.error("%s 模型配置获取失败: %s", self.log_prefix, model_id)
             return False, "模型配置无效"
 
         # 配置验证
@@ -441,25 +694,25 @@ class SelfiePainterAction(BaseAction):
         if not http_base_url:
             error_msg = "抱歉，图片生成功能所需的HTTP配置（如API地址）不完整，无法提供服务。"
             await self.send_text(error_msg)
-            logger.error(f"{self.log_prefix} HTTP调用配置缺失: base_url.")
+            logger.error("%s HTTP调用配置缺失: base_url.", self.log_prefix)
             return False, "HTTP配置不完整"
 
         # 检查api_key（comfyui格式允许为空）
         if api_format != "comfyui" and not http_api_key:
             error_msg = "抱歉，图片生成功能所需的HTTP配置（如API密钥）不完整，无法提供服务。"
             await self.send_text(error_msg)
-            logger.error(f"{self.log_prefix} HTTP调用配置缺失: api_key.")
+            logger.error("%s HTTP调用配置缺失: api_key.", self.log_prefix)
             return False, "HTTP配置不完整"
 
         # API密钥验证（comfyui格式不需要API密钥）
         if (
             api_format != "comfyui"
             and isinstance(http_api_key, str)
-            and ("YOUR_API_KEY_HERE" in http_api_key or "xxxxxxxxxxxxxx" in http_api_key)
+            and is_placeholder_api_key(http_api_key)
         ):
             error_msg = "图片生成功能尚未配置，请设置正确的API密钥。"
             await self.send_text(error_msg)
-            logger.error(f"{self.log_prefix} API密钥未配置")
+            logger.error("%s API密钥未配置", self.log_prefix)
             return False, "API密钥未配置"
 
         # 获取模型配置参数
@@ -468,23 +721,25 @@ class SelfiePainterAction(BaseAction):
         # 合并额外的负面提示词（如自拍手部质量负面提示词）
         if extra_negative_prompt:
             model_config = merge_negative_prompt(model_config, extra_negative_prompt)
-            logger.info(f"{self.log_prefix} 合并额外负面提示词: {extra_negative_prompt[:80]}...")
+            logger.info("%s 合并额外负面提示词: %s...", self.log_prefix, extra_negative_prompt[:80])
 
         # 使用统一的尺寸处理逻辑
         image_size, llm_original_size = get_image_size(model_config, size, self.log_prefix)
 
         # 验证图片尺寸格式
         if not self._validate_image_size(image_size):
-            logger.warning(f"{self.log_prefix} 无效的图片尺寸: {image_size}，使用模型默认值")
+            logger.warning("%s 无效的图片尺寸: %s，使用模型默认值", self.log_prefix, image_size)
             image_size = model_config.get("default_size", "1024x1024")
 
+        # 调试信息开关只读取一次，后续所有调试消息共用
+        enable_debug: bool = bool(self.get_config("components.enable_debug_info", False))
+
         # 检查缓存
         is_img2img = input_image_base64 is not None
         cached_result = self.cache_manager.get_cached_result(description, model_name, image_size, strength, is_img2img)
 
         if cached_result:
-            logger.info(f"{self.log_prefix} 使用缓存的图片结果")
-            enable_debug = self.get_config("components.enable_debug_info", False)
+            logger.info("%s 使用缓存的图片结果", self.log_prefix)
             if enable_debug:
                 await self.send_text("我之前画过类似的图片，用之前的结果~")
             send_success = await self.send_image(cached_result)
@@ -494,7 +749,6 @@ class SelfiePainterAction(BaseAction):
                 self.cache_manager.remove_cached_result(description, model_name, image_size, strength, is_img2img)
 
         # 显示处理信息
-        enable_debug = self.get_config("components.enable_debug_info", False)
         if enable_debug:
             mode_text = "图生图" if is_img2img else "文生图"
             await self.send_text(
@@ -510,7 +764,7 @@ class SelfiePainterAction(BaseAction):
 
             # 获取对应格式的API客户端并调用
             api_client = self._get_api_client(api_format)
-            success, result = await api_client.generate_image(
+            generate_coro = api_client.generate_image(
                 prompt=description,
                 model_config=model_config,
                 size=image_size,
@@ -518,8 +772,14 @@ class SelfiePainterAction(BaseAction):
                 input_image_base64=input_image_base64,
                 max_retries=max_retries,
             )
+            if is_img2img:
+                success, result = await generate_coro
+            else:
+                # 文生图：参数完全相同的并发请求合并为一次 API 调用
+                inflight_key = txt2img_coalesce_key(model_config, image_size, description)
+                success, result = await run_coalesced_txt2img(inflight_key, generate_coro, self.log_prefix)
         except Exception as e:
-            logger.error(f"{self.log_prefix} 异步请求执行失败: {e!r}", exc_info=True)
+            logger.error("%s 异步请求执行失败: %r", self.log_prefix, e, exc_info=True)
             success = False
             result = f"图片生成服务遇到意外问题: {str(e)[:100]}"
 
@@ -532,15 +792,17 @@ class SelfiePainterAction(BaseAction):
                 )
                 if resolved_ok:
                     send_timestamp = time_module.time()
-                    send_success = await self.send_image(resolved_data)
-                    if send_success:
+                    send_result = await self.send_image(resolved_data)
+                    if send_result:
                         mode_text = "图生图" if is_img2img else "文生图"
                         if enable_debug:
                             await self.send_text(f"{mode_text}完成！")
                         self.cache_manager.cache_result(
                             description, model_name, image_size, strength, is_img2img, resolved_data
                         )
-                        await self._schedule_auto_recall_for_recent_message(model_config, model_id, send_timestamp)
+                        await self._schedule_auto_recall_for_recent_message(
+                            model_config, model_id, send_timestamp, extract_sent_message_id(send_result)
+                        )
                         return True, f"{mode_text}已成功生成并发送"
                     else:
                         await self.send_text("图片已处理完成，但发送失败了")
@@ -561,20 +823,25 @@ class SelfiePainterAction(BaseAction):
         if not model_id:
             model_id_raw: object = self.get_config("generation.default_model", "model1")
             model_id = model_id_raw if isinstance(model_id_raw, str) and model_id_raw else "model1"
+        cached = self._model_config_cache.get(model_id)
+        if cached is not None:
+            return cached
         default_model_id_raw: object = self.get_config("generation.default_model", "model1")
         default_model_id: str = (
             default_model_id_raw if isinstance(default_model_id_raw, str) and default_model_id_raw else "model1"
         )
-        return get_model_config(self.get_config, model_id, default_model_id, self.log_prefix) or {}
+        model_config = get_model_config(self.get_config, model_id, default_model_id, self.log_prefix) or {}
+        self._model_config_cache[model_id] = model_config
+        return model_config
 
-    def _download_and_encode_base64(self, image_url: str) -> Tuple[bool, str]:
+    async def _download_and_encode_base64(self, image_url: str) -> Tuple[bool, str]:
         """下载图片并转换为base64（带代理支持）"""
         if self.get_config("proxy.enabled", False):
             proxy_url = self.get_config("proxy.url", "http://127.0.0.1:7890")
-            return self.image_processor.download_and_encode_base64(image_url, proxy_url=str(proxy_url))
+            return await self.image_processor.download_and_encode_base64_async(image_url, proxy_url=str(proxy_url))
 
         # 下层实现的参数类型声明不是 Optional[str]，这里用空字符串表示“无代理”。
-        return self.image_processor.download_and_encode_base64(image_url, proxy_url="")
+        return await self.image_processor.download_and_encode_base64_async(image_url, proxy_url="")
 
     def _validate_image_size(self, size: str) -> bool:
         """验证图片尺寸格式是否正确（委托给size_utils）"""
@@ -607,11 +874,11 @@ class SelfiePainterAction(BaseAction):
         }
         mapped_prompt: str = predefined_map.get(outfit_prompt_clean, "")
         if mapped_prompt:
-            logger.info(f"{self.log_prefix} 衣柜：中文穿搭命中本地映射 → {outfit_prompt_clean} => {mapped_prompt}")
+            logger.info("%s 衣柜：中文穿搭命中本地映射 → %s => %s", self.log_prefix, outfit_prompt_clean, mapped_prompt)
             return mapped_prompt
 
         try:
-            logger.info(f"{self.log_prefix} 衣柜：检测到中文穿搭，尝试翻译为英文提示词 → {outfit_prompt_clean}")
+            logger.info("%s 衣柜：检测到中文穿搭，尝试翻译为英文提示词 → %s", self.log_prefix, outfit_prompt_clean)
             translate_success, translated_outfit = await optimize_prompt(
                 outfit_prompt_clean,
                 log_prefix=f"{self.log_prefix} [wardrobe-translate]",
@@ -621,16 +888,16 @@ class SelfiePainterAction(BaseAction):
                 custom_api_model=str(self.get_config("prompt_optimizer.custom_api_model", "")),
             )
         except Exception as translate_exc:
-            logger.warning(f"{self.log_prefix} 衣柜：翻译中文穿搭失败，跳过直接注入: {translate_exc}")
+            logger.warning("%s 衣柜：翻译中文穿搭失败，跳过直接注入: %s", self.log_prefix, translate_exc)
             return ""
 
         translated_outfit_clean: str = translated_outfit.strip() if isinstance(translated_outfit, str) else ""
         translated_has_cjk: bool = any("\u4e00" <= ch <= "\u9fff" for ch in translated_outfit_clean)
         if translate_success and translated_outfit_clean and not translated_has_cjk:
-            logger.info(f"{self.log_prefix} 衣柜：中文穿搭已翻译为英文提示词 → {translated_outfit_clean}")
+            logger.info("%s 衣柜：中文穿搭已翻译为英文提示词 → %s", self.log_prefix, translated_outfit_clean)
             return translated_outfit_clean
 
-        logger.info(f"{self.log_prefix} 衣柜：翻译结果不可用，跳过直接注入 → {outfit_prompt_clean}")
+        logger.info("%s 衣柜：翻译结果不可用，跳过直接注入 → %s", self.log_prefix, outfit_prompt_clean)
         return ""
 
     async def _process_selfie_prompt(
@@ -653,8 +920,6 @@ class SelfiePainterAction(BaseAction):
         Returns:
             (prompt, negative_prompt) 元组：处理后的正面提示词和负面提示词
         """
-        import random
-
         # 1. 添加强制主体设置（含手部质量引导）
         # forced_subject = "(1girl:1.4), (solo:1.3), (perfect hands:1.2), (correct anatomy:1.1)"
 
@@ -666,7 +931,7 @@ class SelfiePainterAction(BaseAction):
         raw_mode: bool = bool(self.get_config("selfie.raw_mode", False))
 
         # 2.1 可选：注入衣柜系统选择的穿搭 prompt（只影响自拍，不影响 /dr 普通画图）
-        # 注入点要求：必须在 bot_appearance append 到 prompt_parts 之前完成。
+        # 注入点要求：必须在 bot_appearance 写入 prompt_keywords 之前完成。
         try:
             wardrobe_enabled: bool = bool(self.get_config("wardrobe.enabled", False))
             if wardrobe_enabled:
@@ -694,7 +959,7 @@ class SelfiePainterAction(BaseAction):
                 )
 
                 if outfit_prompt:
-                    logger.info(f"{self.log_prefix} 衣柜：选择穿搭 → {outfit_prompt}")
+                    logger.info("%s 衣柜：选择穿搭 → %s", self.log_prefix, outfit_prompt)
                     outfit_prompt_clean = await self._translate_wardrobe_outfit_prompt(outfit_prompt)
 
                     if outfit_prompt_clean:
@@ -703,32 +968,21 @@ class SelfiePainterAction(BaseAction):
                         else:
                             bot_appearance = f"{bot_appearance}, {outfit_prompt_clean}"
                 else:
-                    logger.debug(f"{self.log_prefix} 衣柜：未匹配到穿搭")
+                    logger.debug("%s 衣柜：未匹配到穿搭", self.log_prefix)
         except Exception as exc:
             # 衣柜属于"增强项"，任何异常都不应影响自拍主流程
-            logger.warning(f"{self.log_prefix} 衣柜：注入穿搭失败，将忽略: {exc}")
-        # 3. 定义自拍风格特定的场景设置
-        if selfie_style == "mirror":
-            # 对镜自拍风格：全身反射，明确镜前空间关系，避免镜子变传送门
-            selfie_scene = (
-                "(mirror selfie:1.4), standing in front of large mirror, "
-                "full body reflection in mirror, mirror frame visible, "
-                "indoor scene"
-            )
-        elif selfie_style == "photo":
-            # 第三人称照片风格：不加任何固定场景约束，完全由角色外观+LLM动作/环境决定构图
-            selfie_scene = ""
-        else:
-            # 标准自拍风格：场景在步骤6确定 hand_action 后再覆盖赋值
-            selfie_scene = "(selfie:1.4), close-up, looking at viewer, two hands only"
+            logger.warning("%s 衣柜：注入穿搭失败，将忽略: %s", self.log_prefix, exc)
+        # 3. 定义自拍风格特定的场景设置（固定片段已预先拆分为 (原文, 去重键)）
+        # 标准自拍风格的场景会在步骤6确定 hand_action 后再覆盖赋值
+        selfie_scene: Sequence[Tuple[str, str]] = _SELFIE_SCENE_KEYWORDS.get(selfie_style, _STANDARD_SCENE_KEYWORDS)
 
         # 4. 选择手部动作（优先级：LLM参数 > 日程场景 > LLM按描述生成 > 风格动作池兜底）
         if free_hand_action:
             hand_action = free_hand_action
-            logger.info(f"{self.log_prefix} 使用LLM生成的手部动作: {free_hand_action}")
+            logger.info("%s 使用LLM生成的手部动作: %s", self.log_prefix, free_hand_action)
         elif activity_scene and activity_scene.get("hand_action"):
             hand_action = activity_scene["hand_action"]
-            logger.info(f"{self.log_prefix} 使用日程活动动作: {hand_action}")
+            logger.info("%s 使用日程活动动作: %s", self.log_prefix, hand_action)
         else:
             hand_action = None
             # 描述足够具体时才调 LLM 生成手部动作，太短/太泛直接走动作池
@@ -745,72 +999,63 @@ class SelfiePainterAction(BaseAction):
 
                     hand_action = await generate_hand_action_with_llm(description, selfie_style)
                     if hand_action:
-                        logger.info(f"{self.log_prefix} LLM 生成{selfie_style}风格手部动作: {hand_action[:60]}")
+                        logger.info("%s LLM 生成%s风格手部动作: %s", self.log_prefix, selfie_style, hand_action[:60])
                 except Exception as e:
-                    logger.debug(f"{self.log_prefix} LLM 手部动作生成失败: {e}")
+                    logger.debug("%s LLM 手部动作生成失败: %s", self.log_prefix, e)
             # LLM 未调用或失败，从动作池兜底
             if not hand_action:
                 hand_action = random.choice(self._get_hand_actions_for_style(selfie_style))
-                logger.info(f"{self.log_prefix} 动作池随机{selfie_style}风格: {hand_action}")
+                logger.info("%s 动作池随机%s风格: %s", self.log_prefix, selfie_style, hand_action)
 
-        # 5. 组装完整提示词
-        prompt_parts: list[str] = []
+        # 5. 组装完整提示词：收集的同时按去重键去重（避免重复关键词），固定片段使用预计算的键
+        prompt_keywords: Dict[str, str] = {}
 
         if bot_appearance:
-            prompt_parts.append(bot_appearance)
+            _add_unique_keywords(prompt_keywords, _split_prompt_keywords(bot_appearance))
 
         # 日程活动的表情和光线（如果有）
         if activity_scene:
             if activity_scene.get("expression"):
-                prompt_parts.append(f"({activity_scene['expression']}:1.2)")
+                expression_prompt = f"({activity_scene['expression']}:1.2)"
+                _add_unique_keywords(prompt_keywords, _split_prompt_keywords(expression_prompt))
             if activity_scene.get("lighting"):
-                prompt_parts.append(activity_scene["lighting"])
+                _add_unique_keywords(prompt_keywords, _split_prompt_keywords(activity_scene["lighting"]))
 
         # 6. 手部动作处理：过滤不当词汇 + 按风格加权重
-        import re as _re
-
         # standard 模式过滤手机类词汇（LLM 可能返回含 phone 的动作）
         if selfie_style == "standard" and hand_action:
-            if _re.search(r"\b(phone|smartphone|mobile|device)\b", hand_action, flags=_re.IGNORECASE):
+            hand_action_lower = hand_action.lower()
+            # 先做子串预检，绝大多数动作不含这些词，可跳过正则匹配
+            if any(hint in hand_action_lower for hint in _PHONE_KEYWORD_HINTS) and _PHONE_KEYWORD_PATTERN.search(
+                hand_action
+            ):
                 hand_action = "resting head on hand"
 
         if hand_action:
             if selfie_style == "standard":
                 # 新统一模板：伸手向镜头 + 另一手做动作 + 两手可见
-                selfie_scene = (
-                    "(selfie:1.4), looking at viewer, "
-                    "one arm extended forward towards camera and hand out of frame, "
-                    f"another hand making {hand_action}, two hands only"
-                )
+                selfie_scene = [
+                    *_STANDARD_SCENE_HEAD_KEYWORDS,
+                    *_split_prompt_keywords(f"another hand making {hand_action}"),
+                    *_STANDARD_SCENE_TAIL_KEYWORDS,
+                ]
             # standard: selfie_scene 已在上方覆写，无需额外 hand_prompt
             elif selfie_style == "photo":
                 pass  # photo 模式不注入 hand_action，动作由日程环境自然决定
             else:  # mirror
                 hand_prompt = f"({hand_action}:1.3)"
-                prompt_parts.append(hand_prompt)
+                _add_unique_keywords(prompt_keywords, _split_prompt_keywords(hand_prompt))
 
         # 日程活动的环境（如果有，补充到自拍场景之前）
         if activity_scene and activity_scene.get("environment"):
-            prompt_parts.append(activity_scene["environment"])
+            _add_unique_keywords(prompt_keywords, _split_prompt_keywords(activity_scene["environment"]))
 
         if not raw_mode and selfie_scene:
-            prompt_parts.append(selfie_scene)
-        prompt_parts.append(description)
+            _add_unique_keywords(prompt_keywords, selfie_scene)
+        _add_unique_keywords(prompt_keywords, _split_prompt_keywords(description))
 
-        # 7. 合并并去重
-        final_prompt = ", ".join(prompt_parts)
-
-        # 简单的去重处理（避免重复关键词）
-        keywords = [kw.strip() for kw in final_prompt.split(",")]
-        seen = set()
-        unique_keywords = []
-        for kw in keywords:
-            kw_lower = kw.lower()
-            if kw_lower not in seen and kw:
-                seen.add(kw_lower)
-                unique_keywords.append(kw)
-
-        final_prompt = ", ".join(unique_keywords)
+        # 7. 合并（去重已在收集时完成）
+        final_prompt = ", ".join(prompt_keywords.values())
 
         # 构建自拍负面提示词
         # 读取配置中的基础负面提示词
@@ -855,107 +1100,21 @@ class SelfiePainterAction(BaseAction):
             if selfie_style:
                 normalized_style = normalize_selfie_style(selfie_style)
                 logger.info(
-                    f"{self.log_prefix} 自拍风格: {get_selfie_style_display_name(normalized_style)}（{normalized_style}）"
+                    "%s 自拍风格: %s（%s）", self.log_prefix, get_selfie_style_display_name(normalized_style), normalized_style
                 )
-            logger.info(f"{self.log_prefix} 正面提示词（完整）: {positive_prompt}")
+            logger.info("%s 正面提示词（完整）: %s", self.log_prefix, positive_prompt)
             if negative_prompt:
-                logger.info(f"{self.log_prefix} 负面提示词（完整）: {negative_prompt}")
+                logger.info("%s 负面提示词（完整）: %s", self.log_prefix, negative_prompt)
             return
 
-        logger.info(f"{self.log_prefix} {default_preview_label}: {positive_prompt[:100]}...")
+        logger.info("%s %s: %s...", self.log_prefix, default_preview_label, positive_prompt[:100])
         if negative_prompt:
-            logger.info(f"{self.log_prefix} 自拍模式负面提示词: {negative_prompt[:150]}...")
-
-    # ---- 风格专用手部动作池 ----
-    # standard: 一只手举手机（画面外），只有另一只手空闲，仅单手动作
-    _STANDARD_HAND_ACTIONS = [
-        "peace sign, v sign",
-        "waving hand, friendly gesture",
-        "thumbs up, positive gesture",
-        "single hand heart gesture, cute gesture",
-        "touching cheek gently, soft expression",
-        "hand near chin, thinking pose",
-        "one hand playing with hair, casual",
-        "hand on hip, confident pose",
-        "adjusting hair, elegant gesture",
-        "resting chin on hand, relaxed",
-        "finger on lips, secretive",
-        "hand on chest, gentle",
-        "tucking hair behind ear, elegant",
-        "touching necklace, delicate gesture",
-        "hand near eye level, cute gesture",
-        "cat paw gesture, playful",
-        "saluting, playful military pose",
-        "hand covering mouth slightly, shy smile",
-        "blowing kiss, romantic",
-        "index finger pointing up, idea pose",
-        "hand cupping own cheek, adorable",
-        "hand resting on collarbone, graceful",
-        "pinching own cheek, playful",
-    ]
-
-    # mirror: 一只手拿手机对着镜子拍（画面内可见），另一只手空闲，全身或半身
-    _MIRROR_HAND_ACTIONS = [
-        "hand on hip, confident pose",
-        "hand in hair, adjusting hairstyle",
-        "hand on waist, model pose",
-        "fixing collar, neat appearance",
-        "adjusting earring, elegant detail",
-        "hand touching shoulder, graceful",
-        "hand behind head, relaxed pose",
-        "one hand on thigh, standing pose",
-        "hand resting at side, natural",
-        "hand lightly touching mirror, playful",
-        "fixing skirt, adjusting outfit",
-        "hand on bag strap, casual",
-        "brushing bangs aside, stylish",
-        "hand in pocket, cool pose",
-        "hand on chin, thoughtful pose",
-        "adjusting glasses, intellectual",
-        "checking watch, elegant gesture",
-        "holding strand of hair, delicate",
-        "hand near face, model pose",
-        "touching hat brim, fashionable",
-    ]
-
-    # photo: 他人拍摄视角，双手都自由，可以有更自然丰富的全身姿态
-    _PHOTO_HAND_ACTIONS = [
-        "hands behind back, standing gracefully",
-        "hands in pockets, casual walk",
-        "one hand in hair wind blowing, dynamic",
-        "arms at sides, natural standing",
-        "holding coffee cup, cafe scene",
-        "hands clasped in front, gentle pose",
-        "holding bag, walking pose",
-        "leaning on railing, one hand resting",
-        "sitting with hands on lap, relaxed",
-        "hand on hat, windy day",
-        "twirling, arms slightly out, dynamic spin",
-        "arms stretched out, embracing scenery",
-        "holding flower, smelling gently",
-        "hand shielding eyes from sun, looking afar",
-        "carrying shopping bags, casual walk",
-        "holding book to chest, scholarly",
-        "one hand waving at camera, candid",
-        "both hands holding drink, warm gesture",
-        "hands on knees, sitting pose",
-        "leaning against wall, arms relaxed",
-        "crouching down, hands on knees, playful angle",
-        "running toward camera, joyful",
-        "holding umbrella, rainy atmosphere",
-        "hand reaching out toward camera, inviting",
-        "sitting on bench, legs crossed, elegant",
-    ]
+            logger.info("%s 自拍模式负面提示词: %s...", self.log_prefix, negative_prompt[:150])
 
     @staticmethod
-    def _get_hand_actions_for_style(selfie_style: str) -> list[str]:
+    def _get_hand_actions_for_style(selfie_style: str) -> Tuple[str, ...]:
         """根据自拍风格返回对应的手部动作池"""
-        if selfie_style == "mirror":
-            return SelfiePainterAction._MIRROR_HAND_ACTIONS
-        elif selfie_style == "photo":
-            return SelfiePainterAction._PHOTO_HAND_ACTIONS
-        else:
-            return SelfiePainterAction._STANDARD_HAND_ACTIONS
+        return _HAND_ACTIONS_BY_STYLE.get(selfie_style, _STANDARD_HAND_ACTIONS)
 
     def _get_selfie_reference_image(self) -> Optional[str]:
         """获取自拍参考图片的base64编码
@@ -971,20 +1130,20 @@ class SelfiePainterAction(BaseAction):
         try:
             # 处理相对路径（相对于插件目录）
             if not os.path.isabs(image_path):
-                plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                image_path = os.path.join(plugin_dir, image_path)
-
-            if os.path.exists(image_path):
-                with open(image_path, "rb") as f:
-                    image_data = f.read()
-                image_base64 = base64.b64encode(image_data).decode("utf-8")
-                logger.info(f"{self.log_prefix} 从文件加载自拍参考图片: {image_path}")
-                return image_base64
-            else:
-                logger.warning(f"{self.log_prefix} 自拍参考图片文件不存在: {image_path}")
+                image_path = os.path.join(_PLUGIN_DIR, image_path)
+
+            try:
+                st = os.stat(image_path)
+            except FileNotFoundError:
+                logger.warning("%s 自拍参考图片文件不存在: %s", self.log_prefix, image_path)
                 return None
+
+            # 以 (路径, 修改时间, 大小) 为键缓存编码结果，文件未变化时直接复用
+            image_base64 = _load_reference_image_base64(image_path, st.st_mtime_ns, st.st_size)
+            logger.info("%s 从文件加载自拍参考图片: %s", self.log_prefix, image_path)
+            return image_base64
         except Exception as e:
-            logger.error(f"{self.log_prefix} 加载自拍参考图片失败: {e}")
+            logger.error("%s 加载自拍参考图片失败: %s", self.log_prefix, e)
             return None
 
     async def _schedule_auto_recall_for_recent_message(
@@ -992,6 +1151,7 @@ class SelfiePainterAction(BaseAction):
         model_config: Optional[Dict[str, Any]] = None,
         model_id: Optional[str] = None,
         send_timestamp: float = 0.0,
+        message_id: Optional[str] = None,
     ):
         """安排最近发送消息的自动撤回"""
         global_enabled: bool = bool(self.get_config("auto_recall.enabled", False))
@@ -1003,10 +1163,13 @@ class SelfiePainterAction(BaseAction):
             return
 
         if model_id and not runtime_state.is_recall_enabled(self.chat_id, model_id, global_enabled):
-            logger.info(f"{self.log_prefix} 模型 {model_id} 撤回已在当前聊天流禁用")
+            logger.info("%s 模型 %s 撤回已在当前聊天流禁用", self.log_prefix, model_id)
             return
 
-        await schedule_auto_recall(self.chat_id, delay_seconds, self.log_prefix, self.send_command, send_timestamp)
+        platform = str(getattr(self, "platform", "") or "")
+        await schedule_auto_recall(
+            self.chat_id, delay_seconds, self.log_prefix, self.send_command, send_timestamp, message_id, platform
+        )
 
     async def _generate_image_only(
         self,
@@ -1040,7 +1203,7 @@ class SelfiePainterAction(BaseAction):
         # 获取模型配置
         model_config = self._get_model_config(model_id)
         if not model_config:
-            logger.error(f"{self.log_prefix} [image_only] 模型配置获取失败: {model_id}")
+            logger.error("%s [image_only] 模型配置获取失败: %s", self.log_prefix, model_id)
             return False, f"模型 '{model_id}' 不存在或配置无效"
 
         # 配置验证
@@ -1060,7 +1223,7 @@ class SelfiePainterAction(BaseAction):
         if (
             api_format != "comfyui"
             and isinstance(http_api_key, str)
-            and ("YOUR_API_KEY_HERE" in http_api_key or "xxxxxxxxxxxxxx" in http_api_key)
+            and is_placeholder_api_key(http_api_key)
         ):
             return False, "API密钥未配置"
 
@@ -1089,7 +1252,7 @@ class SelfiePainterAction(BaseAction):
                 max_retries=max_retries,
             )
         except Exception as e:
-            logger.error(f"{self.log_prefix} [image_only] 生图异常: {e!r}")
+            logger.error("%s [image_only] 生图异常: %r", self.log_prefix, e)
             return False, f"生图异常: {str(e)[:100]}"
 
         if not success:
@@ -1125,54 +1288,22 @@ class SelfiePainterAction(BaseAction):
         if not message_text:
             return ""
 
-        import re
-
-        # 移除常见的画图相关前缀
-        patterns_to_remove = [
-            r"^画",  # "画"
-            r"^绘制",  # "绘制"
-            r"^生成图片",  # "生成图片"
-            r"^画图",  # "画图"
-            r"^帮我画",  # "帮我画"
-            r"^请画",  # "请画"
-            r"^能不能画",  # "能不能画"
-            r"^可以画",  # "可以画"
-            r"^画一个",  # "画一个"
-            r"^画一只",  # "画一只"
-            r"^画张",  # "画张"
-            r"^画幅",  # "画幅"
-            r"^图[：:]",  # "图："或"图:"
-            r"^生成图片[：:]",  # "生成图片："或"生成图片:"
-            r"^[：:]",  # 单独的冒号
-            r"^用\s*模型\s*\S+\s*",  # "用模型3" / "用 模型 abc"
-            r"^用\s*model\s*\S+\s*",  # "用model2" / "用 model abc"
-        ]
-
-        cleaned_text = message_text
-        for pattern in patterns_to_remove:
-            cleaned_text = re.sub(pattern, "", cleaned_text, flags=re.IGNORECASE)
-
-        # 移除常见的后缀
-        suffix_patterns = [
-            r"图片$",  # "图片"
-            r"图$",  # "图"
-            r"一下$",  # "一下"
-            r"呗$",  # "呗"
-            r"吧$",  # "吧"
-        ]
-
-        for pattern in suffix_patterns:
-            cleaned_text = re.sub(pattern, "", cleaned_text, flags=re.IGNORECASE)
-
-        # 清理空白字符
-        cleaned_text = cleaned_text.strip()
+        # 先截断再清理：前后缀都只有几个字，预留到最终长度的两倍足够，超长粘贴内容不会拖慢清理
+        if len(message_text) > _DESCRIPTION_SCAN_LIMIT:
+            message_text = message_text[:_DESCRIPTION_SCAN_LIMIT]
+
+        # 移除常见的画图相关前缀和后缀（字面量匹配，无需正则）
+        cleaned_text = _strip_description_affixes(message_text)
+
+        # 清理首尾空白与残留冒号
+        cleaned_text = cleaned_text.strip(_DESCRIPTION_STRIP_CHARS)
 
         # 如果清理后为空，返回原消息（可能是简单的描述）
         if not cleaned_text:
             cleaned_text = message_text
 
         # 限制长度，避免过长的描述
-        if len(cleaned_text) > 100:
-            cleaned_text = cleaned_text[:100]
+        if len(cleaned_text) > _DESCRIPTION_MAX_LENGTH:
+            cleaned_text = cleaned_text[:_DESCRIPTION_MAX_LENGTH]
 
         return cleaned_text
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import os
 import re
 import time as time_module
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from src.plugin_system.base.base_command import BaseCommand  # pyright: ignore[reportMissingImports]
 from src.common.logger import get_logger  # pyright: ignore[reportMissingImports]
 
-from .api_clients import ApiClient
+from .api_clients import ApiClient, run_coalesced_txt2img, txt2img_coalesce_key
 from .utils import (
     ImageProcessor,
     RoleReferenceStore,
@@ -19,63 +21,205 @@ from .utils import (
     inject_llm_original_size,
     resolve_image_data,
     schedule_auto_recall,
+    extract_sent_message_id,
     normalize_selfie_style,
     get_selfie_style_display_name,
+    is_admin_user,
     is_chat_allowed_for_model,
+    is_context_allowed,
     describe_access_rule,
 )
 
 logger = get_logger("mais_art.command")
 
+# 配置缺失哨兵：区分"配置不存在"和"配置值为 None"
+_CONFIG_MISSING = object()
+
+# 需要管理员权限的配置管理操作
+_ADMIN_ONLY_CONFIG_ACTIONS = frozenset(
+    {"set", "reset", "on", "off", "model", "recall", "default", "selfie", "refresh", "clear", "status"}
+)
+
+# 回复给用户的错误信息最大长度
+_ERROR_REPLY_LIMIT = 100
+
+# 后台发送中的确认消息任务，持有强引用防止被提前回收
+_ACK_SEND_TASKS: Set["asyncio.Task[Any]"] = set()
+
+# /dr 后不能直接使用的配置管理保留词
+_CONFIG_RESERVED_WORDS = frozenset({"list", "models", "config", "set", "reset", "styles", "style", "help"})
+# 自然语言特征动作词，合并为一个正则单次扫描
+_ACTION_WORD_PATTERN = re.compile(
+    "|".join(
+        map(re.escape, ("画", "生成", "绘制", "创作", "制作", "画成", "变成", "改成", "用", "来", "帮我", "给我"))
+    )
+)
+
+# 从描述中提取模型ID：用/使用 + model/模型 + 数字/ID
+_MODEL_EXTRACT_PATTERNS = (
+    re.compile(r"(?:用|使用)\s*(model\d+)", re.IGNORECASE),  # 用model1, 使用model2
+    re.compile(r"(?:用|使用)\s*(?:模型|型号)\s*(\d+)", re.IGNORECASE),  # 用模型1, 使用型号2
+    re.compile(r"^(model\d+)", re.IGNORECASE),  # model1开头
+)
+# 从描述中移除模型指定部分
+_MODEL_REMOVE_PATTERNS = (
+    re.compile(r"(?:用|使用)\s*model\d+\s*(?:画|生成|创作)?", re.IGNORECASE),
+    re.compile(r"(?:用|使用)\s*(?:模型|型号)\s*\d+\s*(?:画|生成|创作)?", re.IGNORECASE),
+    re.compile(r"^model\d+\s*(?:画|生成|创作)?", re.IGNORECASE),
+)
+
+# /dr help 文本：静态内容在导入时拼接一次
+_HELP_BASIC_LINES = (
+    "🎨 图片风格系统帮助\n",
+    "📋 基本命令：",
+    "• /dr <风格名> - 对最近的图片应用风格",
+    "• /dr <描述> - 自然语言生成图片",
+    "• /dr styles - 列出所有可用风格",
+    "• /dr list - 查看所有模型",
+    "• /dr config - 查看当前配置",
+)
+_HELP_ADMIN_LINES = (
+    "\n⚙️ 管理员命令：",
+    "• /dr on|off - 开关插件",
+    "• /dr model on|off <模型ID> - 开关模型",
+    "• /dr recall on|off <模型ID> - 开关撤回",
+    "• /dr selfie on|off - 开关自拍日程增强",
+    "• /dr selfie standard|mirror|photo - 切换自拍风格",
+    "• /dr default <模型ID> - 设置默认模型",
+    "• /dr set <模型ID> - 设置/dr命令模型",
+    "• /dr style <风格名> - 查看风格详情",
+    "• /dr refresh <角色名> - 刷新角色参考图",
+    "• /dr status <角色名> - 查看角色参考状态",
+    "• /dr clear <角色名> - 清除角色参考缓存",
+    "• /dr reset - 重置所有配置",
+)
+_HELP_USAGE_LINES = (
+    "\n💡 使用流程：",
+    "1. 发送一张图片",
+    "2. 使用 /dr <风格名> 进行风格转换",
+    "3. 等待处理完成",
+)
+_HELP_USER = "\n".join(_HELP_BASIC_LINES + _HELP_USAGE_LINES)
+_HELP_ADMIN = "\n".join(_HELP_BASIC_LINES + _HELP_ADMIN_LINES + _HELP_USAGE_LINES)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_style_alias_index(alias_items: Tuple[Tuple[str, str], ...]) -> Dict[str, str]:
+    """把 style_aliases 配置展开为 {别名: 风格名} 反向索引（同一别名以先出现的风格为准）"""
+    index: Dict[str, str] = {}
+    for english_name, aliases_str in alias_items:
+        for alias in aliases_str.split(","):
+            index.setdefault(alias.strip(), english_name)
+    return index
+
+
+def _on_ack_sent(task: "asyncio.Task[Any]") -> None:
+    """确认消息发送完成回调：释放引用并记录发送异常"""
+    _ACK_SEND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("发送确认消息失败: %r", task.exception())
+
 
 class PicCommandMixin(BaseCommand):
     """公共方法混入，供 PicGenerationCommand / PicConfigCommand / PicStyleCommand 共用"""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._config_cache: Dict[str, Any] = {}  # 单次 execute 内的配置读取缓存
+        self._style_alias_index: Optional[Dict[str, str]] = None
+        self._permission_cache: Optional[bool] = None
+
+    def _reset_config_cache(self) -> None:
+        """清空本实例的配置读取缓存及由配置派生的索引"""
+        self._config_cache.clear()
+        self._style_alias_index = None
+        self._permission_cache = None
+
+    def get_config(self, key: str, default: Any = None) -> Any:
+        """读取配置（同一次 execute 内按键缓存，避免热路径上重复遍历配置字典）"""
+        value = self._config_cache.get(key, _CONFIG_MISSING)
+        if value is _CONFIG_MISSING:
+            value = super().get_config(key, _CONFIG_MISSING)
+            self._config_cache[key] = value
+        return default if value is _CONFIG_MISSING else value
+
+    async def _reply_error(self, error: Exception, user_prefix: str, result_prefix: str) -> Tuple[bool, str, bool]:
+        """向用户回复截断后的错误信息，并返回命令失败结果（异常文本只格式化一次）"""
+        error_text = str(error)
+        await self.send_text(f"{user_prefix}{error_text[:_ERROR_REPLY_LIMIT]}")
+        return False, f"{result_prefix}{error_text}", True
+
+    def _get_config_dict(self, key: str) -> Dict[str, Any]:
+        """读取字典类型的配置项，缺失或类型不符时返回空字典"""
+        value = self.get_config(key, _CONFIG_MISSING)
+        return value if isinstance(value, dict) else {}
+
     def _get_chat_id(self) -> Optional[str]:
         """获取当前聊天流ID"""
         try:
             chat_stream = self.message.chat_stream if self.message else None
             return chat_stream.stream_id if chat_stream else None
         except (AttributeError, TypeError) as exc:
-            logger.debug(f"{self.log_prefix} 获取聊天流ID失败，返回空: {exc}")
+            logger.debug("%s 获取聊天流ID失败，返回空: %s", self.log_prefix, exc)
             return None
 
+    def _send_ack(self, text: str) -> None:
+        """后台发送简短确认消息，不阻塞处理函数返回（仅用于之后没有其他发送的场景）"""
+        task = asyncio.create_task(self.send_text(text))
+        _ACK_SEND_TASKS.add(task)
+        task.add_done_callback(_on_ack_sent)
+
     def _check_permission(self) -> bool:
-        """检查用户权限"""
+        """检查用户权限（同一次 execute 内只判定一次）"""
+        if self._permission_cache is not None:
+            return self._permission_cache
         try:
-            admin_users_raw: Any = self.get_config("components.admin_users", [])
-            admin_users: list[str] = (
-                [str(user_id) for user_id in admin_users_raw] if isinstance(admin_users_raw, list) else []
-            )
-            user_id = (
-                str(self.message.message_info.user_info.user_id)
-                if self.message and self.message.message_info and self.message.message_info.user_info
-                else None
-            )
-            return user_id in admin_users
+            user_info = getattr(getattr(self.message, "message_info", None), "user_info", None)
+            user_id = getattr(user_info, "user_id", None)
+            self._permission_cache = is_admin_user(self.get_config("components.admin_users", []), user_id)
         except (AttributeError, TypeError, KeyError) as exc:
-            logger.debug(f"{self.log_prefix} 权限检查失败，按无权限处理: {exc}")
-            return False
+            logger.debug("%s 权限检查失败，按无权限处理: %s", self.log_prefix, exc)
+            self._permission_cache = False
+        return self._permission_cache
+
+    def _get_style_alias_index(self) -> Dict[str, str]:
+        """获取 {别名: 风格名} 反向索引（本实例内只构建一次，跨实例按配置内容复用）"""
+        if self._style_alias_index is None:
+            style_aliases_config = self._get_config_dict("style_aliases")
+            self._style_alias_index = _build_style_alias_index(
+                tuple((name, aliases) for name, aliases in style_aliases_config.items() if isinstance(aliases, str))
+            )
+        return self._style_alias_index
+
+    def _get_style_aliases(self, style_name: str) -> List[str]:
+        """获取指定风格配置的别名列表（按风格名直接取值，无需遍历别名配置）"""
+        alias_names = self._get_config_dict("style_aliases").get(style_name)
+        if not isinstance(alias_names, str):
+            return []
+        return [name.strip() for name in alias_names.split(",")]
+
+    def _lookup_style(self, content: str) -> Optional[Tuple[str, str]]:
+        """按风格名或别名查找风格，返回 (实际风格名, 风格提示词)，不存在时返回 None
 
-    def _resolve_style_alias(self, style_name: str) -> str:
-        """解析风格别名，返回实际的风格名"""
+        styles 与 style_aliases 各只读取一次，别名通过反向索引直接命中
+        """
         try:
-            if self.get_config(f"styles.{style_name}"):
-                return style_name
-
-            style_aliases_config = self.get_config("style_aliases", {})
-            if isinstance(style_aliases_config, dict):
-                for english_name, aliases_str in style_aliases_config.items():
-                    if isinstance(aliases_str, str):
-                        aliases = [alias.strip() for alias in aliases_str.split(",")]
-                        if style_name in aliases:
-                            logger.info(f"{self.log_prefix} 风格别名 '{style_name}' 解析为 '{english_name}'")
-                            return english_name
-
-            return style_name
+            styles = self._get_config_dict("styles")
+            style_name = content
+            if style_name not in styles:
+                style_name = self._get_style_alias_index().get(content, "")
+                if style_name not in styles:
+                    return None
+                logger.info("%s 风格别名 '%s' 解析为 '%s'", self.log_prefix, content, style_name)
+
+            style_prompt = styles[style_name]
+            if not style_prompt or not isinstance(style_prompt, str):
+                logger.warning("%s 风格 %s 配置不存在或格式错误", self.log_prefix, style_name)
+                return None
+            return style_name, style_prompt.strip()
         except Exception as e:
-            logger.error(f"{self.log_prefix} 解析风格别名失败: {e!r}")
-            return style_name
+            logger.error("%s 获取风格配置失败: %r", self.log_prefix, e)
+            return None
 
     @staticmethod
     def _create_role_reference_store(command: BaseCommand) -> "RoleReferenceStore":
@@ -125,7 +269,7 @@ class PicCommandMixin(BaseCommand):
 
     async def _optimize_generation_prompt(self, description: str) -> str:
         """按当前配置优化普通生图提示词，失败时回退原文。"""
-        logger.info(f"{self.log_prefix} 开始优化提示词...")
+        logger.info("%s 开始优化提示词...", self.log_prefix)
         custom_base_url: str = str(self.get_config("prompt_optimizer.custom_api_base_url", ""))
         custom_api_key: str = str(self.get_config("prompt_optimizer.custom_api_key", ""))
         custom_model: str = str(self.get_config("prompt_optimizer.custom_api_model", ""))
@@ -137,10 +281,10 @@ class PicCommandMixin(BaseCommand):
             custom_api_model=custom_model,
         )
         if success:
-            logger.info(f"{self.log_prefix} 提示词优化完成: {optimized_prompt[:80]}...")
+            logger.info("%s 提示词优化完成: %s...", self.log_prefix, optimized_prompt[:80])
             return optimized_prompt
 
-        logger.warning(f"{self.log_prefix} 提示词优化失败，使用原始描述")
+        logger.warning("%s 提示词优化失败，使用原始描述", self.log_prefix)
         return description
 
 
@@ -156,6 +300,7 @@ class PicGenerationCommand(PicCommandMixin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._image_processor = None
+        self._api_client = None
 
     @property
     def image_processor(self) -> "ImageProcessor":
@@ -164,9 +309,17 @@ class PicGenerationCommand(PicCommandMixin):
             self._image_processor = ImageProcessor(self)
         return self._image_processor
 
+    @property
+    def api_client(self) -> "ApiClient":
+        """复用 ApiClient 实例"""
+        if self._api_client is None:
+            self._api_client = ApiClient(self)
+        return self._api_client
+
     async def execute(self) -> Tuple[bool, Optional[str], bool]:
         """执行图生图命令，智能判断风格模式或自然语言模式"""
-        logger.info(f"{self.log_prefix} 执行图生图命令")
+        logger.info("%s 执行图生图命令", self.log_prefix)
+        self._reset_config_cache()
 
         # 获取聊天流ID
         chat_id = self._get_chat_id()
@@ -177,7 +330,7 @@ class PicGenerationCommand(PicCommandMixin):
         # 检查插件是否在当前聊天流启用
         global_enabled: bool = bool(self.get_config("plugin.enabled", True))
         if not runtime_state.is_plugin_enabled(chat_id, global_enabled):
-            logger.info(f"{self.log_prefix} 插件在当前聊天流已禁用")
+            logger.info("%s 插件在当前聊天流已禁用", self.log_prefix)
             return False, "插件已禁用", True
 
         # 获取匹配的内容
@@ -188,30 +341,28 @@ class PicGenerationCommand(PicCommandMixin):
             return False, "缺少内容参数", True
 
         # 检查是否是配置管理保留词，避免冲突
-        config_reserved_words = {"list", "models", "config", "set", "reset", "styles", "style", "help"}
-        if content.lower() in config_reserved_words:
+        if content.lower() in _CONFIG_RESERVED_WORDS:
             await self.send_text(f"'{content}' 是保留词，请使用其他名称")
             return False, f"使用了保留词: {content}", True
 
         # 智能判断：风格模式 vs 自然语言模式
         # 步骤1：优先检查配置文件中是否有该风格
-        actual_style_name = self._resolve_style_alias(content)
-        style_prompt = self._get_style_prompt(actual_style_name)
+        style_match = self._lookup_style(content)
 
-        if style_prompt:
+        if style_match:
+            actual_style_name, style_prompt = style_match
             # 配置文件中存在该风格 → 风格模式（只支持图生图）
-            logger.info(f"{self.log_prefix} 识别为风格模式: {content}")
+            logger.info("%s 识别为风格模式: %s", self.log_prefix, content)
             return await self._execute_style_mode(content, actual_style_name, style_prompt)
 
         # 步骤2：配置中没有该风格，判断是否是自然语言
         # 检测自然语言特征
-        action_words = ["画", "生成", "绘制", "创作", "制作", "画成", "变成", "改成", "用", "来", "帮我", "给我"]
-        has_action_word = any(word in content for word in action_words)
+        has_action_word = _ACTION_WORD_PATTERN.search(content) is not None
         is_long_text = len(content) > 6
 
         if has_action_word or is_long_text:
             # 包含动作词或文本较长 → 自然语言模式（智能判断文/图生图）
-            logger.info(f"{self.log_prefix} 识别为自然语言模式: {content}")
+            logger.info("%s 识别为自然语言模式: %s", self.log_prefix, content)
             return await self._execute_natural_mode(content)
         else:
             # 短词且不包含动作词 → 可能是拼错的风格名，提示用户
@@ -257,23 +408,29 @@ class PicGenerationCommand(PicCommandMixin):
         if enable_debug:
             await self.send_text(f"使用风格：{style_name}")
 
-        # 获取最近的图片作为输入图片
-        input_image_base64 = await self.image_processor.get_recent_image()
-
-        if not input_image_base64:
-            await self.send_text("请先发送图片")
-            return False, "未找到输入图片", True
-
         # 检查模型是否支持图生图
         if not model_config.get("support_img2img", True):
             await self.send_text(f"模型 {model_id} 不支持图生图")
             return False, f"模型 {model_id} 不支持图生图", True
 
-        # 使用统一的尺寸处理逻辑（异步版本，支持 LLM 选择尺寸）
-        image_size, llm_original_size = await get_image_size_async(
-            model_config, final_description, None, self.log_prefix
+        # 尺寸只取决于风格提示词，与读取输入图片并发进行（异步版本，支持 LLM 选择尺寸）
+        size_task = asyncio.create_task(
+            get_image_size_async(model_config, final_description, None, self.log_prefix)
         )
 
+        try:
+            # 获取最近的图片作为输入图片
+            input_image_base64 = await self.image_processor.get_recent_image()
+
+            if not input_image_base64:
+                await self.send_text("请先发送图片")
+                return False, "未找到输入图片", True
+
+            image_size, llm_original_size = await size_task
+        finally:
+            # 提前返回或读取图片异常时不留下孤立的尺寸任务（已完成的任务 cancel 无副作用）
+            size_task.cancel()
+
         # 显示开始信息
         if enable_debug:
             await self.send_text(f"正在使用 {model_id} 模型进行 {style_name} 风格转换...")
@@ -287,7 +444,7 @@ class PicGenerationCommand(PicCommandMixin):
             model_config = inject_llm_original_size(model_config, llm_original_size or "")
 
             # 调用API客户端生成图片
-            api_client = ApiClient(self)
+            api_client = self.api_client
             success, result = await api_client.generate_image(
                 prompt=final_description,
                 model_config=model_config,
@@ -296,40 +453,12 @@ class PicGenerationCommand(PicCommandMixin):
                 input_image_base64=input_image_base64,
                 max_retries=max_retries,
             )
-
-            if success:
-                # 统一处理 API 响应（dict/str 等）→ 纯字符串
-                final_image_data = self.image_processor.process_api_response(result)
-                if not final_image_data:
-                    await self.send_text("API返回数据格式错误")
-                    return False, "API返回数据格式错误", True
-
-                # 处理结果：统一解析为 base64
-                resolved_ok, resolved_data = await resolve_image_data(
-                    final_image_data, self._download_and_encode_base64, self.log_prefix
-                )
-                if resolved_ok:
-                    send_timestamp = time_module.time()
-                    send_success = await self.send_image(resolved_data)
-                    if send_success:
-                        if enable_debug:
-                            await self.send_text(f"{style_name} 风格转换完成！")
-                        await self._schedule_auto_recall_for_recent_message(model_config, model_id, send_timestamp)
-                        return True, "图生图命令执行成功", True
-                    else:
-                        await self.send_text("图片发送失败")
-                        return False, "图片发送失败", True
-                else:
-                    await self.send_text(f"图片处理失败：{resolved_data}")
-                    return False, f"图片处理失败: {resolved_data}", True
-            else:
-                await self.send_text(f"{style_name} 风格转换失败：{result}")
-                return False, f"图生图失败: {result}", True
-
+            return await self._deliver_result(
+                success, result, model_config, model_id, f"{style_name} 风格转换", "图生图", enable_debug
+            )
         except Exception as e:
-            logger.error(f"{self.log_prefix} 命令执行异常: {e!r}", exc_info=True)
-            await self.send_text(f"执行失败：{str(e)[:100]}")
-            return False, f"命令执行异常: {str(e)}", True
+            logger.error("%s 命令执行异常: %r", self.log_prefix, e, exc_info=True)
+            return await self._reply_error(e, "执行失败：", "命令执行异常: ")
 
     async def _execute_natural_mode(self, description: str) -> Tuple[bool, Optional[str], bool]:
         """执行自然语言模式（智能判断文生图/图生图）
@@ -348,7 +477,7 @@ class PicGenerationCommand(PicCommandMixin):
             model_id = extracted_model_id
             # 移除模型指定部分
             description = self._remove_model_pattern(description)
-            logger.info(f"{self.log_prefix} 从描述中提取模型ID: {model_id}")
+            logger.info("%s 从描述中提取模型ID: %s", self.log_prefix, model_id)
         else:
             # 从运行时状态获取默认模型
             global_command_raw: Any = self.get_config("components.pic_command_model", "model1")
@@ -379,15 +508,29 @@ class PicGenerationCommand(PicCommandMixin):
         # 检查是否启用调试信息
         enable_debug = self.get_config("components.enable_debug_info", False)
 
-        # 智能检测：判断是文生图还是图生图
-        input_image_base64 = await self.image_processor.get_recent_image()
+        # 读取最近图片与提示词优化（可能是远程 LLM 调用）互不依赖，先在后台读取图片
+        image_task = asyncio.create_task(self.image_processor.get_recent_image())
+
+        # 提示词优化
+        optimizer_enabled = bool(self.get_config("prompt_optimizer.enabled", True))
+        optimizer_timing = self._get_prompt_optimizer_timing()
+        try:
+            if optimizer_enabled and optimizer_timing == "before":
+                description = await self._optimize_generation_prompt(description)
+
+            # 智能检测：判断是文生图还是图生图
+            input_image_base64 = await image_task
+        finally:
+            # 提示词优化异常时取消后台读取图片的任务
+            image_task.cancel()
+
         is_img2img_mode = input_image_base64 is not None
 
         if is_img2img_mode:
             # 图生图模式
             # 检查模型是否支持图生图
             if not model_config.get("support_img2img", True):
-                logger.warning(f"{self.log_prefix} 模型 {model_id} 不支持图生图，自动降级为文生图")
+                logger.warning("%s 模型 %s 不支持图生图，自动降级为文生图", self.log_prefix, model_id)
                 if enable_debug:
                     await self.send_text(f"模型 {model_id} 不支持图生图，将为您生成新图片")
                 # 降级为文生图
@@ -395,13 +538,7 @@ class PicGenerationCommand(PicCommandMixin):
                 is_img2img_mode = False
 
         mode_text = "图生图" if is_img2img_mode else "文生图"
-        logger.info(f"{self.log_prefix} 自然语言模式使用{mode_text}")
-
-        # 提示词优化
-        optimizer_enabled = bool(self.get_config("prompt_optimizer.enabled", True))
-        optimizer_timing = self._get_prompt_optimizer_timing()
-        if optimizer_enabled and optimizer_timing == "before":
-            description = await self._optimize_generation_prompt(description)
+        logger.info("%s 自然语言模式使用%s", self.log_prefix, mode_text)
 
         # 注入角色参考特征（在优化后、尺寸计算前）
         description = self._inject_role_features(description)
@@ -424,8 +561,8 @@ class PicGenerationCommand(PicCommandMixin):
             model_config = inject_llm_original_size(model_config, llm_original_size or "")
 
             # 调用API客户端生成图片
-            api_client = ApiClient(self)
-            success, result = await api_client.generate_image(
+            api_client = self.api_client
+            generate_coro = api_client.generate_image(
                 prompt=description,
                 model_config=model_config,
                 size=image_size,
@@ -433,40 +570,16 @@ class PicGenerationCommand(PicCommandMixin):
                 input_image_base64=input_image_base64,
                 max_retries=max_retries,
             )
-
-            if success:
-                # 统一处理 API 响应（dict/str 等）→ 纯字符串
-                final_image_data = self.image_processor.process_api_response(result)
-                if not final_image_data:
-                    await self.send_text("API返回数据格式错误")
-                    return False, "API返回数据格式错误", True
-
-                # 处理结果：统一解析为 base64
-                resolved_ok, resolved_data = await resolve_image_data(
-                    final_image_data, self._download_and_encode_base64, self.log_prefix
-                )
-                if resolved_ok:
-                    send_timestamp = time_module.time()
-                    send_success = await self.send_image(resolved_data)
-                    if send_success:
-                        if enable_debug:
-                            await self.send_text(f"{mode_text}完成！")
-                        await self._schedule_auto_recall_for_recent_message(model_config, model_id, send_timestamp)
-                        return True, f"{mode_text}命令执行成功", True
-                    else:
-                        await self.send_text("图片发送失败")
-                        return False, "图片发送失败", True
-                else:
-                    await self.send_text(f"图片处理失败：{resolved_data}")
-                    return False, f"图片处理失败: {resolved_data}", True
+            if is_img2img_mode:
+                success, result = await generate_coro
             else:
-                await self.send_text(f"{mode_text}失败：{result}")
-                return False, f"{mode_text}失败: {result}", True
-
+                # 文生图：群聊中短时间内参数完全相同的 /dr 请求合并为一次 API 调用
+                inflight_key = txt2img_coalesce_key(model_config, image_size, description)
+                success, result = await run_coalesced_txt2img(inflight_key, generate_coro, self.log_prefix)
+            return await self._deliver_result(success, result, model_config, model_id, mode_text, mode_text, enable_debug)
         except Exception as e:
-            logger.error(f"{self.log_prefix} 命令执行异常: {e!r}", exc_info=True)
-            await self.send_text(f"执行失败：{str(e)[:100]}")
-            return False, f"命令执行异常: {str(e)}", True
+            logger.error("%s 命令执行异常: %r", self.log_prefix, e, exc_info=True)
+            return await self._reply_error(e, "执行失败：", "命令执行异常: ")
 
     def _extract_model_id(self, description: str) -> Optional[str]:
         """从描述中提取模型ID
@@ -477,15 +590,8 @@ class PicGenerationCommand(PicCommandMixin):
         - model1画...
         - 使用model2...
         """
-        # 匹配模式：用/使用 + model/模型 + 数字/ID
-        patterns = [
-            r"(?:用|使用)\s*(model\d+)",  # 用model1, 使用model2
-            r"(?:用|使用)\s*(?:模型|型号)\s*(\d+)",  # 用模型1, 使用型号2
-            r"^(model\d+)",  # model1开头
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
+        for pattern in _MODEL_EXTRACT_PATTERNS:
+            match = pattern.search(description)
             if match:
                 model_id = match.group(1)
                 # 如果匹配到数字，转换为modelX格式
@@ -497,15 +603,8 @@ class PicGenerationCommand(PicCommandMixin):
 
     def _remove_model_pattern(self, description: str) -> str:
         """移除描述中的模型指定部分"""
-        # 移除模式
-        patterns = [
-            r"(?:用|使用)\s*model\d+\s*(?:画|生成|创作)?",
-            r"(?:用|使用)\s*(?:模型|型号)\s*\d+\s*(?:画|生成|创作)?",
-            r"^model\d+\s*(?:画|生成|创作)?",
-        ]
-
-        for pattern in patterns:
-            description = re.sub(pattern, "", description, flags=re.IGNORECASE)
+        for pattern in _MODEL_REMOVE_PATTERNS:
+            description = pattern.sub("", description)
 
         return description.strip()
 
@@ -513,28 +612,87 @@ class PicGenerationCommand(PicCommandMixin):
         """获取模型配置"""
         return get_model_config(self.get_config, model_id, log_prefix=self.log_prefix)
 
-    def _get_style_prompt(self, style_name: str) -> Optional[str]:
-        """获取风格提示词"""
-        try:
-            style_prompt = self.get_config(f"styles.{style_name}")
-            if style_prompt and isinstance(style_prompt, str):
-                return style_prompt.strip()
-            else:
-                logger.warning(f"{self.log_prefix} 风格 {style_name} 配置不存在或格式错误")
-                return None
-        except Exception as e:
-            logger.error(f"{self.log_prefix} 获取风格配置失败: {e!r}")
-            return None
-
-    def _download_and_encode_base64(self, image_url: str) -> Tuple[bool, str]:
-        """下载图片并转换为base64编码（委托给 ImageProcessor）"""
+    async def _download_and_encode_base64(self, image_url: str) -> Tuple[bool, str]:
+        """下载图片并转换为base64编码（委托给 ImageProcessor 的异步实现）"""
         proxy_url = ""
         if self.get_config("proxy.enabled", False):
             proxy_url = str(self.get_config("proxy.url", "http://127.0.0.1:7890") or "")
-        return self.image_processor.download_and_encode_base64(image_url, proxy_url=proxy_url)
+        return await self.image_processor.download_and_encode_base64_async(image_url, proxy_url=proxy_url)
+
+    async def _deliver_result(
+        self,
+        success: bool,
+        result: Any,
+        model_config: Dict[str, Any],
+        model_id: str,
+        task_label: str,
+        result_label: str,
+        enable_debug: bool = False,
+    ) -> Tuple[bool, Optional[str], bool]:
+        """处理 API 生成结果：解析为 base64 后发送，失败时提示用户
+
+        Args:
+            success: API 调用是否成功
+            result: API 返回结果或错误信息
+            model_config: 模型配置（用于自动撤回）
+            model_id: 模型ID
+            task_label: 面向用户的任务描述，如 "xxx 风格转换" / "文生图"
+            result_label: 命令返回值中的任务名，如 "图生图"
+            enable_debug: 是否发送完成提示
+        """
+        if not success:
+            await self.send_text(f"{task_label}失败：{result}")
+            return False, f"{result_label}失败: {result}", True
+
+        # 统一处理 API 响应（dict/str 等）→ 纯字符串
+        final_image_data = self.image_processor.process_api_response(result)
+        if not final_image_data:
+            await self.send_text("API返回数据格式错误")
+            return False, "API返回数据格式错误", True
+
+        # 处理结果：统一解析为 base64
+        resolved_ok, resolved_data = await resolve_image_data(
+            final_image_data, self._download_and_encode_base64, self.log_prefix
+        )
+        if not resolved_ok:
+            await self.send_text(f"图片处理失败：{resolved_data}")
+            return False, f"图片处理失败: {resolved_data}", True
+
+        done_text = f"{task_label}完成！" if enable_debug else None
+        if not await self._deliver_image(resolved_data, model_config, model_id, done_text):
+            await self.send_text("图片发送失败")
+            return False, "图片发送失败", True
+        return True, f"{result_label}命令执行成功", True
+
+    async def _deliver_image(
+        self,
+        image_base64: str,
+        model_config: Dict[str, Any],
+        model_id: str,
+        done_text: Optional[str] = None,
+    ) -> bool:
+        """发送图片，成功后发送完成提示并安排自动撤回
+
+        Returns:
+            bool: 图片是否发送成功
+        """
+        send_timestamp = time_module.time()
+        send_result = await self.send_image(image_base64)
+        if not send_result:
+            return False
+        if done_text:
+            await self.send_text(done_text)
+        await self._schedule_auto_recall_for_recent_message(
+            model_config, model_id, send_timestamp, extract_sent_message_id(send_result)
+        )
+        return True
 
     async def _schedule_auto_recall_for_recent_message(
-        self, model_config: Optional[Dict[str, Any]] = None, model_id: Optional[str] = None, send_timestamp: float = 0.0
+        self,
+        model_config: Optional[Dict[str, Any]] = None,
+        model_id: Optional[str] = None,
+        send_timestamp: float = 0.0,
+        message_id: Optional[str] = None,
     ):
         """安排最近发送消息的自动撤回"""
         global_enabled: bool = bool(self.get_config("auto_recall.enabled", False))
@@ -547,14 +705,18 @@ class PicGenerationCommand(PicCommandMixin):
 
         chat_id = self._get_chat_id()
         if not chat_id:
-            logger.warning(f"{self.log_prefix} 无法获取 chat_id，跳过自动撤回")
+            logger.warning("%s 无法获取 chat_id，跳过自动撤回", self.log_prefix)
             return
 
         if model_id and not runtime_state.is_recall_enabled(chat_id, model_id, global_enabled):
-            logger.info(f"{self.log_prefix} 模型 {model_id} 撤回已在当前聊天流禁用")
+            logger.info("%s 模型 %s 撤回已在当前聊天流禁用", self.log_prefix, model_id)
             return
 
-        await schedule_auto_recall(chat_id, delay_seconds, self.log_prefix, self.send_command, send_timestamp)
+        message_info = getattr(self.message, "message_info", None)
+        platform = str(getattr(message_info, "platform", "") or "")
+        await schedule_auto_recall(
+            chat_id, delay_seconds, self.log_prefix, self.send_command, send_timestamp, message_id, platform
+        )
 
 
 class PicConfigCommand(PicCommandMixin):
@@ -565,9 +727,28 @@ class PicConfigCommand(PicCommandMixin):
     command_description = "图片生成配置管理：/dr <操作> [参数]"
     command_pattern = r"(?:.*，说：\s*)?/dr\s+(?P<action>list|models|config|set|reset|on|off|model|recall|default|selfie|refresh|clear|status)(?:\s+(?P<params>.*))?$"
 
+    # 操作名 -> 处理函数，统一以 (命令实例, 参数, 聊天流ID, 是否管理员) 调用
+    _ACTION_HANDLERS: Dict[str, Callable[..., Awaitable[Tuple[bool, Optional[str], bool]]]] = {
+        "list": lambda cmd, params, chat_id, is_admin: cmd._list_models(chat_id, is_admin),
+        "models": lambda cmd, params, chat_id, is_admin: cmd._list_models(chat_id, is_admin),
+        "set": lambda cmd, params, chat_id, is_admin: cmd._set_model(params, chat_id),
+        "config": lambda cmd, params, chat_id, is_admin: cmd._show_current_config(chat_id),
+        "reset": lambda cmd, params, chat_id, is_admin: cmd._reset_config(chat_id),
+        "on": lambda cmd, params, chat_id, is_admin: cmd._enable_plugin(chat_id),
+        "off": lambda cmd, params, chat_id, is_admin: cmd._disable_plugin(chat_id),
+        "model": lambda cmd, params, chat_id, is_admin: cmd._toggle_model(params, chat_id),
+        "recall": lambda cmd, params, chat_id, is_admin: cmd._toggle_recall(params, chat_id),
+        "default": lambda cmd, params, chat_id, is_admin: cmd._set_default_model(params, chat_id),
+        "selfie": lambda cmd, params, chat_id, is_admin: cmd._toggle_selfie_schedule(params, chat_id),
+        "refresh": lambda cmd, params, chat_id, is_admin: cmd._refresh_role_reference(params),
+        "clear": lambda cmd, params, chat_id, is_admin: cmd._clear_role_reference(params),
+        "status": lambda cmd, params, chat_id, is_admin: cmd._show_role_reference_status(params),
+    }
+
     async def execute(self) -> Tuple[bool, Optional[str], bool]:
         """执行配置管理命令"""
-        logger.info(f"{self.log_prefix} 执行图片配置管理命令")
+        logger.info("%s 执行图片配置管理命令", self.log_prefix)
+        self._reset_config_cache()
 
         # 获取匹配的参数
         action = self.matched_groups.get("action", "").strip()
@@ -583,62 +764,25 @@ class PicConfigCommand(PicCommandMixin):
             await self.send_text("无法获取聊天信息")
             return False, "无法获取chat_id", True
 
-        # 需要管理员权限的操作
-        admin_only_actions = [
-            "set",
-            "reset",
-            "on",
-            "off",
-            "model",
-            "recall",
-            "default",
-            "selfie",
-            "refresh",
-            "clear",
-            "status",
-        ]
-        if not has_permission and action in admin_only_actions:
+        if not has_permission and action in _ADMIN_ONLY_CONFIG_ACTIONS:
             await self.send_text("你无权使用此命令", storage_message=False)
             return False, "没有权限", True
 
-        if action == "list" or action == "models":
-            return await self._list_models(chat_id, has_permission)
-        elif action == "set":
-            return await self._set_model(params, chat_id)
-        elif action == "config":
-            return await self._show_current_config(chat_id)
-        elif action == "reset":
-            return await self._reset_config(chat_id)
-        elif action == "on":
-            return await self._enable_plugin(chat_id)
-        elif action == "off":
-            return await self._disable_plugin(chat_id)
-        elif action == "model":
-            return await self._toggle_model(params, chat_id)
-        elif action == "recall":
-            return await self._toggle_recall(params, chat_id)
-        elif action == "default":
-            return await self._set_default_model(params, chat_id)
-        elif action == "selfie":
-            return await self._toggle_selfie_schedule(params, chat_id)
-        elif action == "refresh":
-            return await self._refresh_role_reference(params)
-        elif action == "clear":
-            return await self._clear_role_reference(params)
-        elif action == "status":
-            return await self._show_role_reference_status(params)
-        else:
-            await self.send_text(
-                "配置管理命令使用方法：\n"
-                "/dr list - 列出所有可用模型\n"
-                "/dr config - 显示当前配置\n"
-                "/dr set <模型ID> - 设置图生图命令模型\n"
-                "/dr refresh <角色名> - 刷新角色参考图\n"
-                "/dr status <角色名> - 查看角色参考状态\n"
-                "/dr clear <角色名> - 清除角色参考缓存\n"
-                "/dr reset - 重置为默认配置"
-            )
-            return False, "无效的操作参数", True
+        handler = self._ACTION_HANDLERS.get(action)
+        if handler is not None:
+            return await handler(self, params, chat_id, has_permission)
+
+        await self.send_text(
+            "配置管理命令使用方法：\n"
+            "/dr list - 列出所有可用模型\n"
+            "/dr config - 显示当前配置\n"
+            "/dr set <模型ID> - 设置图生图命令模型\n"
+            "/dr refresh <角色名> - 刷新角色参考图\n"
+            "/dr status <角色名> - 查看角色参考状态\n"
+            "/dr clear <角色名> - 清除角色参考缓存\n"
+            "/dr reset - 重置为默认配置"
+        )
+        return False, "无效的操作参数", True
 
     async def _list_models(self, chat_id: str, is_admin: bool) -> Tuple[bool, Optional[str], bool]:
         """列出所有可用的模型"""
@@ -667,14 +811,25 @@ class PicConfigCommand(PicCommandMixin):
             command_default = runtime_state.get_command_default_model(chat_id, global_command)
             disabled_models = runtime_state.get_disabled_models(chat_id)
             recall_disabled = runtime_state.get_recall_disabled_models(chat_id)
+            # 全局访问规则只判定一次，模型级规则直接取自已读取的模型配置
+            global_access_allowed = is_context_allowed(
+                self.get_config("access_control.mode", "blacklist"),
+                self.get_config("access_control.list", []),
+                chat_id,
+            )
 
-            message_lines = ["📋 可用模型列表：\n"]
+            model_entries: List[str] = []
 
             for model_id, config in models_config.items():
                 if isinstance(config, dict):
                     # 检查模型是否被禁用
                     is_disabled = model_id in disabled_models
-                    is_rule_blocked = not is_chat_allowed_for_model(self.get_config, chat_id, model_id)
+                    is_rule_blocked = not (
+                        global_access_allowed
+                        and is_context_allowed(
+                            config.get("access_mode", "blacklist"), config.get("access_list", []), chat_id
+                        )
+                    )
 
                     # 非管理员不显示不可用的模型
                     if (is_disabled or is_rule_blocked) and not is_admin:
@@ -693,24 +848,23 @@ class PicConfigCommand(PicCommandMixin):
                     access_mark = " 🚫" if is_rule_blocked else ""
                     recall_mark = " 🔕" if model_id in recall_disabled else ""
 
-                    message_lines.append(
+                    model_entries.append(
                         f"• {model_id}{default_mark}{command_mark}{img2img_mark}{disabled_mark}{access_mark}{recall_mark}\n"
-                        f"  模型: {model_name}\n"
+                        f"  模型: {model_name}"
                     )
 
-            # 图例说明
-            message_lines.append(
-                "\n📖 图例：✅默认 🔧/dr命令 🖼️图生图 📝仅文生图 ❌运行时禁用 🚫访问规则限制 🔕撤回关闭"
-            )
-
-            message = "\n".join(message_lines)
+            # 标题、模型条目、图例各为一段，段间统一以空行分隔
+            sections = ["📋 可用模型列表："]
+            if model_entries:
+                sections.append("\n\n".join(model_entries))
+            sections.append("📖 图例：✅默认 🔧/dr命令 🖼️图生图 📝仅文生图 ❌运行时禁用 🚫访问规则限制 🔕撤回关闭")
+            message = "\n\n".join(sections)
             await self.send_text(message)
             return True, "模型列表查询成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 列出模型失败: {e!r}")
-            await self.send_text(f"获取模型列表失败：{str(e)[:100]}")
-            return False, f"列出模型失败: {str(e)}", True
+            logger.error("%s 列出模型失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "获取模型列表失败：", "列出模型失败: ")
 
     async def _set_model(self, model_id: str, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """设置图生图命令使用的模型（Command组件）"""
@@ -737,13 +891,12 @@ class PicConfigCommand(PicCommandMixin):
             # 设置运行时状态
             runtime_state.set_command_default_model(chat_id, model_id)
 
-            await self.send_text(f"已切换: {model_id}")
+            self._send_ack(f"已切换: {model_id}")
             return True, f"模型切换成功: {model_id}", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 设置模型失败: {e!r}")
-            await self.send_text(f"设置失败：{str(e)[:100]}")
-            return False, f"设置模型失败: {str(e)}", True
+            logger.error("%s 设置模型失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "设置失败：", "设置模型失败: ")
 
     async def _reset_config(self, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """重置当前聊天流的配置为默认值"""
@@ -771,13 +924,12 @@ class PicConfigCommand(PicCommandMixin):
                 f"使用 /dr config 查看当前配置"
             )
 
-            logger.info(f"{self.log_prefix} 聊天流 {chat_id} 配置已重置")
+            logger.info("%s 聊天流 %s 配置已重置", self.log_prefix, chat_id)
             return True, "配置重置成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 重置配置失败: {e!r}")
-            await self.send_text(f"重置失败：{str(e)[:100]}")
-            return False, f"重置配置失败: {str(e)}", True
+            logger.error("%s 重置配置失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "重置失败：", "重置配置失败: ")
 
     async def _show_current_config(self, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """显示当前配置信息"""
@@ -813,75 +965,79 @@ class PicConfigCommand(PicCommandMixin):
             )
             selfie_style = runtime_state.get_selfie_style(chat_id, global_selfie_style)
 
-            # 获取模型详细信息
-            action_config_raw: Any = self.get_config(f"models.{action_model}", {})
-            action_config: dict[str, Any] = action_config_raw if isinstance(action_config_raw, dict) else {}
-            command_config_raw: Any = self.get_config(f"models.{command_model}", {})
-            command_config: dict[str, Any] = command_config_raw if isinstance(command_config_raw, dict) else {}
-            action_access_summary = describe_access_rule(
-                self.get_config(f"models.{action_model}.access_mode", "blacklist"),
-                self.get_config(f"models.{action_model}.access_list", []),
+            # 获取模型详细信息（默认模型与 /dr 命令模型相同时只计算一次）
+            global_access_allowed = is_context_allowed(
+                self.get_config("access_control.mode", "blacklist"),
+                self.get_config("access_control.list", []),
+                chat_id,
             )
-            command_access_summary = describe_access_rule(
-                self.get_config(f"models.{command_model}.access_mode", "blacklist"),
-                self.get_config(f"models.{command_model}.access_list", []),
+            model_details: Dict[str, Tuple[Dict[str, Any], str, bool]] = {}
+
+            def _get_model_details(model_id: str) -> Tuple[Dict[str, Any], str, bool]:
+                details = model_details.get(model_id)
+                if details is None:
+                    model_config = self._get_config_dict(f"models.{model_id}")
+                    access_mode = model_config.get("access_mode", "blacklist")
+                    access_list = model_config.get("access_list", [])
+                    details = model_details[model_id] = (
+                        model_config,
+                        describe_access_rule(access_mode, access_list),
+                        global_access_allowed and is_context_allowed(access_mode, access_list, chat_id),
+                    )
+                return details
+
+            action_config, action_access_summary, action_access_allowed = _get_model_details(action_model)
+            command_config, command_access_summary, command_access_allowed = _get_model_details(command_model)
+
+            # 构建配置信息：固定部分一次格式化，仅可选尾行按需追加
+            message = (
+                f"⚙️ 当前聊天流配置 (ID: {chat_id[:8]}...)：\n\n"
+                f"🔌 插件状态: {'✅ 启用' if plugin_enabled else '❌ 禁用'}\n"
+                f"🌐 全局访问规则: {global_access_summary}\n"
+                f"🎯 默认模型: {action_model}\n"
+                f"   • 名称: {action_config.get('name', action_config.get('model', '未知'))}\n"
+                f"   • 规则: {action_access_summary}\n"
+                f"   • 当前聊天流: {'✅ 允许' if action_access_allowed else '🚫 禁止'}\n\n"
+                f"🔧 /dr命令模型: {command_model}\n"
+                f"   • 名称: {command_config.get('name', command_config.get('model', '未知'))}\n"
+                f"   • 规则: {command_access_summary}\n"
+                f"   • 当前聊天流: {'✅ 允许' if command_access_allowed else '🚫 禁止'}\n"
+                f"\n📸 自拍日程增强: {'✅ 启用' if selfie_schedule else '❌ 禁用'}\n"
+                f"📷 自拍风格: {selfie_style}"
             )
-            action_access_allowed = is_chat_allowed_for_model(self.get_config, chat_id, action_model)
-            command_access_allowed = is_chat_allowed_for_model(self.get_config, chat_id, command_model)
-
-            # 构建配置信息
-            message_lines = [
-                f"⚙️ 当前聊天流配置 (ID: {chat_id[:8]}...)：\n",
-                f"🔌 插件状态: {'✅ 启用' if plugin_enabled else '❌ 禁用'}",
-                f"🌐 全局访问规则: {global_access_summary}",
-                f"🎯 默认模型: {action_model}",
-                f"   • 名称: {action_config.get('name', action_config.get('model', '未知'))}",
-                f"   • 规则: {action_access_summary}",
-                f"   • 当前聊天流: {'✅ 允许' if action_access_allowed else '🚫 禁止'}\n",
-                f"🔧 /dr命令模型: {command_model}",
-                f"   • 名称: {command_config.get('name', command_config.get('model', '未知'))}",
-                f"   • 规则: {command_access_summary}",
-                f"   • 当前聊天流: {'✅ 允许' if command_access_allowed else '🚫 禁止'}",
-                f"\n📸 自拍日程增强: {'✅ 启用' if selfie_schedule else '❌ 禁用'}",
-                f"📷 自拍风格: {selfie_style}",
-            ]
 
             if disabled_models:
-                message_lines.append(f"\n❌ 已禁用模型: {', '.join(disabled_models)}")
+                message += f"\n\n❌ 已禁用模型: {', '.join(disabled_models)}"
 
             if recall_disabled:
-                message_lines.append(f"🔕 撤回已关闭: {', '.join(recall_disabled)}")
+                message += f"\n🔕 撤回已关闭: {', '.join(recall_disabled)}"
 
-            message = "\n".join(message_lines)
             await self.send_text(message)
             return True, "配置信息查询成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 显示配置失败: {e!r}")
-            await self.send_text(f"获取配置失败：{str(e)[:100]}")
-            return False, f"显示配置失败: {str(e)}", True
+            logger.error("%s 显示配置失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "获取配置失败：", "显示配置失败: ")
 
     async def _enable_plugin(self, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """启用当前聊天流的插件"""
         try:
             runtime_state.set_plugin_enabled(chat_id, True)
-            await self.send_text("已启用")
+            self._send_ack("已启用")
             return True, "插件已启用", True
         except Exception as e:
-            logger.error(f"{self.log_prefix} 启用插件失败: {e!r}")
-            await self.send_text(f"启用失败：{str(e)[:100]}")
-            return False, f"启用插件失败: {str(e)}", True
+            logger.error("%s 启用插件失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "启用失败：", "启用插件失败: ")
 
     async def _disable_plugin(self, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """禁用当前聊天流的插件"""
         try:
             runtime_state.set_plugin_enabled(chat_id, False)
-            await self.send_text("已禁用")
+            self._send_ack("已禁用")
             return True, "插件已禁用", True
         except Exception as e:
-            logger.error(f"{self.log_prefix} 禁用插件失败: {e!r}")
-            await self.send_text(f"禁用失败：{str(e)[:100]}")
-            return False, f"禁用插件失败: {str(e)}", True
+            logger.error("%s 禁用插件失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "禁用失败：", "禁用插件失败: ")
 
     async def _toggle_model(self, params: str, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """开关指定模型"""
@@ -908,13 +1064,12 @@ class PicConfigCommand(PicCommandMixin):
             runtime_state.set_model_enabled(chat_id, model_id, enabled)
 
             status = "启用" if enabled else "禁用"
-            await self.send_text(f"{model_id} 已{status}")
+            self._send_ack(f"{model_id} 已{status}")
             return True, f"模型{status}成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 切换模型状态失败: {e!r}")
-            await self.send_text(f"操作失败：{str(e)[:100]}")
-            return False, f"切换模型状态失败: {str(e)}", True
+            logger.error("%s 切换模型状态失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "操作失败：", "切换模型状态失败: ")
 
     async def _toggle_recall(self, params: str, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """开关指定模型的撤回功能"""
@@ -941,13 +1096,12 @@ class PicConfigCommand(PicCommandMixin):
             runtime_state.set_recall_enabled(chat_id, model_id, enabled)
 
             status = "启用" if enabled else "禁用"
-            await self.send_text(f"{model_id} 撤回已{status}")
+            self._send_ack(f"{model_id} 撤回已{status}")
             return True, f"撤回{status}成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 切换撤回状态失败: {e!r}")
-            await self.send_text(f"操作失败：{str(e)[:100]}")
-            return False, f"切换撤回状态失败: {str(e)}", True
+            logger.error("%s 切换撤回状态失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "操作失败：", "切换撤回状态失败: ")
 
     async def _set_default_model(self, model_id: str, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """设置Action组件的默认模型"""
@@ -973,13 +1127,12 @@ class PicConfigCommand(PicCommandMixin):
 
             runtime_state.set_action_default_model(chat_id, model_id)
 
-            await self.send_text(f"已设置: {model_id}")
+            self._send_ack(f"已设置: {model_id}")
             return True, "设置成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 设置默认模型失败: {e!r}")
-            await self.send_text(f"设置失败：{str(e)[:100]}")
-            return False, f"设置默认模型失败: {str(e)}", True
+            logger.error("%s 设置默认模型失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "设置失败：", "设置默认模型失败: ")
 
     async def _toggle_selfie_schedule(self, params: str, chat_id: str) -> Tuple[bool, Optional[str], bool]:
         """自拍设置：日程开关 + 风格切换"""
@@ -991,7 +1144,7 @@ class PicConfigCommand(PicCommandMixin):
                 enabled = action == "on"
                 runtime_state.set_selfie_schedule_enabled(chat_id, enabled)
                 status = "启用" if enabled else "禁用"
-                await self.send_text(f"自拍日程增强已{status}")
+                self._send_ack(f"自拍日程增强已{status}")
                 return True, f"自拍日程增强{status}成功", True
 
             # /dr selfie standard|mirror|photo → 切换自拍风格
@@ -1007,9 +1160,8 @@ class PicConfigCommand(PicCommandMixin):
             return False, "参数无效", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 自拍设置失败: {e!r}")
-            await self.send_text(f"操作失败：{str(e)[:100]}")
-            return False, f"自拍设置失败: {str(e)}", True
+            logger.error("%s 自拍设置失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "操作失败：", "自拍设置失败: ")
 
     async def _refresh_role_reference(self, params: str) -> Tuple[bool, Optional[str], bool]:
         """刷新指定角色的参考图（搜索 + 下载 + VLM 提取特征）"""
@@ -1070,74 +1222,69 @@ class PicStyleCommand(PicCommandMixin):
     command_description = "图片风格管理：/dr <操作> [参数]"
     command_pattern = r"(?:.*，说：\s*)?/dr\s+(?P<action>styles|style|help)(?:\s+(?P<params>.*))?$"
 
+    # 操作名 -> 处理函数，统一以 (命令实例, 参数) 调用
+    _ACTION_HANDLERS: Dict[str, Callable[..., Awaitable[Tuple[bool, Optional[str], bool]]]] = {
+        "styles": lambda cmd, params: cmd._list_styles(),
+        "style": lambda cmd, params: cmd._show_style(params),
+        "help": lambda cmd, params: cmd._show_help(),
+    }
+
     async def execute(self) -> Tuple[bool, Optional[str], bool]:
         """执行风格管理命令"""
-        logger.info(f"{self.log_prefix} 执行图片风格管理命令")
+        logger.info("%s 执行图片风格管理命令", self.log_prefix)
+        self._reset_config_cache()
 
         # 获取匹配的参数
         action = self.matched_groups.get("action", "").strip()
         params = self.matched_groups.get("params", "") or ""
         params = params.strip()
 
-        # 检查用户权限
-        has_permission = self._check_permission()
-
-        # style命令需要管理员权限
-        if action == "style" and not has_permission:
+        # style命令需要管理员权限（仅在该分支才检查，styles/help 无需读取管理员配置）
+        if action == "style" and not self._check_permission():
             await self.send_text("你无权使用此命令", storage_message=False)
             return False, "没有权限", True
 
-        if action == "styles":
-            return await self._list_styles()
-        elif action == "style":
-            return await self._show_style(params)
-        elif action == "help":
-            return await self._show_help()
-        else:
-            await self.send_text(
-                "风格管理命令使用方法：\n"
-                "/dr styles - 列出所有可用风格\n"
-                "/dr style <风格名> - 显示风格详情\n"
-                "/dr help - 显示帮助信息"
-            )
-            return False, "无效的操作参数", True
+        handler = self._ACTION_HANDLERS.get(action)
+        if handler is not None:
+            return await handler(self, params)
+
+        await self.send_text(
+            "风格管理命令使用方法：\n"
+            "/dr styles - 列出所有可用风格\n"
+            "/dr style <风格名> - 显示风格详情\n"
+            "/dr help - 显示帮助信息"
+        )
+        return False, "无效的操作参数", True
 
     async def _list_styles(self) -> Tuple[bool, Optional[str], bool]:
         """列出所有可用的风格"""
         try:
-            styles_config_raw: Any = self.get_config("styles", {})
-            aliases_config_raw: Any = self.get_config("style_aliases", {})
-            styles_config: dict[str, Any] = styles_config_raw if isinstance(styles_config_raw, dict) else {}
-            aliases_config: dict[str, Any] = aliases_config_raw if isinstance(aliases_config_raw, dict) else {}
+            styles_config = self._get_config_dict("styles")
 
             if not styles_config:
                 await self.send_text("未找到任何风格配置")
                 return False, "无风格配置", True
 
-            message_lines = ["🎨 可用风格列表：\n"]
+            style_lines: List[str] = []
 
             for style_id, prompt in styles_config.items():
                 if isinstance(prompt, str):
-                    # 查找这个风格的别名
-                    aliases = []
-                    for alias_style, alias_names in aliases_config.items():
-                        if alias_style == style_id and isinstance(alias_names, str):
-                            aliases = [name.strip() for name in alias_names.split(",")]
-                            break
-
+                    aliases = self._get_style_aliases(style_id)
                     alias_text = f" (别名: {', '.join(aliases)})" if aliases else ""
 
-                    message_lines.append(f"• {style_id}{alias_text}")
+                    style_lines.append(f"• {style_id}{alias_text}")
 
-            message_lines.append("\n💡 使用方法: /dr <风格名>")
-            message = "\n".join(message_lines)
+            sections = ["🎨 可用风格列表："]
+            if style_lines:
+                sections.append("\n".join(style_lines))
+            sections.append("💡 使用方法: /dr <风格名>")
+            message = "\n\n".join(sections)
             await self.send_text(message)
             return True, "风格列表查询成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 列出风格失败: {e!r}")
-            await self.send_text(f"获取风格列表失败：{str(e)[:100]}")
-            return False, f"列出风格失败: {str(e)}", True
+            logger.error("%s 列出风格失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "获取风格列表失败：", "列出风格失败: ")
 
     async def _show_style(self, style_name: str) -> Tuple[bool, Optional[str], bool]:
         """显示指定风格的详细信息"""
@@ -1147,85 +1294,32 @@ class PicStyleCommand(PicCommandMixin):
                 return False, "缺少风格名参数", True
 
             # 解析风格别名
-            actual_style = self._resolve_style_alias(style_name)
-            style_prompt = self.get_config(f"styles.{actual_style}")
-
-            if not style_prompt:
+            style_match = self._lookup_style(style_name)
+            if not style_match:
                 await self.send_text(f"风格 '{style_name}' 不存在，请使用 /dr styles 查看可用风格")
                 return False, f"风格 '{style_name}' 不存在", True
 
-            # 查找别名
-            aliases_config_raw: Any = self.get_config("style_aliases", {})
-            aliases_config: dict[str, Any] = aliases_config_raw if isinstance(aliases_config_raw, dict) else {}
-            aliases = []
-            for alias_style, alias_names in aliases_config.items():
-                if alias_style == actual_style and isinstance(alias_names, str):
-                    aliases = [name.strip() for name in alias_names.split(",")]
-                    break
-
-            message_lines = [f"🎨 风格详情：{actual_style}\n", "📝 完整提示词：", f"{style_prompt}\n"]
+            actual_style, style_prompt = style_match
+            aliases = self._get_style_aliases(actual_style)
 
+            sections = [f"🎨 风格详情：{actual_style}", f"📝 完整提示词：\n{style_prompt}"]
             if aliases:
-                message_lines.append(f"🏷️ 别名: {', '.join(aliases)}\n")
-
-            message_lines.extend(["💡 使用方法：", f"/dr {style_name}", "\n⚠️ 注意：需要先发送一张图片作为输入"])
-
-            message = "\n".join(message_lines)
+                sections.append(f"🏷️ 别名: {', '.join(aliases)}")
+            sections.extend([f"💡 使用方法：\n/dr {style_name}", "⚠️ 注意：需要先发送一张图片作为输入"])
+            message = "\n\n".join(sections)
             await self.send_text(message)
             return True, "风格详情查询成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 显示风格详情失败: {e!r}")
-            await self.send_text(f"获取风格详情失败：{str(e)[:100]}")
-            return False, f"显示风格详情失败: {str(e)}", True
+            logger.error("%s 显示风格详情失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "获取风格详情失败：", "显示风格详情失败: ")
 
     async def _show_help(self) -> Tuple[bool, Optional[str], bool]:
         """显示帮助信息"""
         try:
-            has_permission = self._check_permission()
-
-            lines = [
-                "🎨 图片风格系统帮助\n",
-                "📋 基本命令：",
-                "• /dr <风格名> - 对最近的图片应用风格",
-                "• /dr <描述> - 自然语言生成图片",
-                "• /dr styles - 列出所有可用风格",
-                "• /dr list - 查看所有模型",
-                "• /dr config - 查看当前配置",
-            ]
-
-            if has_permission:
-                lines.extend(
-                    [
-                        "\n⚙️ 管理员命令：",
-                        "• /dr on|off - 开关插件",
-                        "• /dr model on|off <模型ID> - 开关模型",
-                        "• /dr recall on|off <模型ID> - 开关撤回",
-                        "• /dr selfie on|off - 开关自拍日程增强",
-                        "• /dr selfie standard|mirror|photo - 切换自拍风格",
-                        "• /dr default <模型ID> - 设置默认模型",
-                        "• /dr set <模型ID> - 设置/dr命令模型",
-                        "• /dr style <风格名> - 查看风格详情",
-                        "• /dr refresh <角色名> - 刷新角色参考图",
-                        "• /dr status <角色名> - 查看角色参考状态",
-                        "• /dr clear <角色名> - 清除角色参考缓存",
-                        "• /dr reset - 重置所有配置",
-                    ]
-                )
-
-            lines.extend(
-                [
-                    "\n💡 使用流程：",
-                    "1. 发送一张图片",
-                    "2. 使用 /dr <风格名> 进行风格转换",
-                    "3. 等待处理完成",
-                ]
-            )
-
-            await self.send_text("\n".join(lines))
+            await self.send_text(_HELP_ADMIN if self._check_permission() else _HELP_USER)
             return True, "帮助信息显示成功", True
 
         except Exception as e:
-            logger.error(f"{self.log_prefix} 显示帮助失败: {e!r}")
-            await self.send_text(f"显示帮助信息失败：{str(e)[:100]}")
-            return False, f"显示帮助失败: {str(e)}", True
+            logger.error("%s 显示帮助失败: %r", self.log_prefix, e)
+            return await self._reply_error(e, "显示帮助信息失败：", "显示帮助失败: ")
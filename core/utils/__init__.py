@@ -2,6 +2,7 @@
 
 from .shared_constants import (
     BASE64_IMAGE_PREFIXES,
+    BASE64_IMAGE_MAGIC,
     ANTI_DUAL_HANDS_PROMPT,
     SELFIE_HAND_NEGATIVE,
     ANTI_DUAL_PHONE_PROMPT,
@@ -12,7 +13,7 @@ from .shared_constants import (
     normalize_selfie_style,
     get_selfie_style_display_name,
 )
-from .model_utils import get_model_config, merge_negative_prompt, inject_llm_original_size
+from .model_utils import get_model_config, merge_negative_prompt, inject_llm_original_size, is_placeholder_api_key
 from .image_utils import ImageProcessor
 from .image_send_utils import resolve_image_data
 from .size_utils import (
@@ -24,11 +25,17 @@ from .size_utils import (
 )
 from .cache_manager import CacheManager
 from .time_utils import to_minutes, is_in_time_range
-from .recall_utils import schedule_auto_recall
+from .recall_utils import schedule_auto_recall, extract_sent_message_id
 from .prompt_optimizer import PromptOptimizer, optimize_prompt
 from .runtime_state import runtime_state
 from .role_reference_store import RoleReferenceStore
-from .access_control import build_target_context_id, describe_access_rule, is_chat_allowed_for_model
+from .access_control import (
+    build_target_context_id,
+    describe_access_rule,
+    is_admin_user,
+    is_chat_allowed_for_model,
+    is_context_allowed,
+)
 
 __all__ = [
     "ANTI_DUAL_HANDS_PROMPT",
@@ -36,6 +43,7 @@ __all__ = [
     "ANTI_CAMERA_DEVICE_PROMPT",
     "ANTI_MIRROR_PORTAL_PROMPT",
     "BASE64_IMAGE_PREFIXES",
+    "BASE64_IMAGE_MAGIC",
     "CacheManager",
     "ImageProcessor",
     "PromptOptimizer",
@@ -47,6 +55,7 @@ __all__ = [
     "get_selfie_style_display_name",
     "get_model_config",
     "inject_llm_original_size",
+    "is_placeholder_api_key",
     "is_in_time_range",
     "merge_negative_prompt",
     "normalize_selfie_style",
@@ -56,10 +65,13 @@ __all__ = [
     "resolve_image_data",
     "runtime_state",
     "schedule_auto_recall",
+    "extract_sent_message_id",
     "RoleReferenceStore",
     "build_target_context_id",
     "describe_access_rule",
+    "is_admin_user",
     "is_chat_allowed_for_model",
+    "is_context_allowed",
     "to_minutes",
     "validate_image_size",
 ]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Callable
 
 
@@ -35,16 +36,56 @@ def normalize_context_id(context_id: object) -> str:
 
 
 def normalize_access_list(access_list: object) -> list[str]:
-    """标准化访问列表。"""
+    """标准化访问列表（保持原顺序并去除重复项）。"""
     if not isinstance(access_list, list):
         return []
 
-    normalized_list: list[str] = []
+    normalized_items: dict[str, None] = {}
     for item in access_list:
         normalized_item: str = normalize_context_id(item)
         if normalized_item:
-            normalized_list.append(normalized_item)
-    return normalized_list
+            normalized_items[normalized_item] = None
+    return list(normalized_items)
+
+
+@lru_cache(maxsize=32)
+def _build_access_set(access_items: tuple[object, ...]) -> frozenset[str]:
+    """按列表内容缓存标准化后的访问集合，配置未变时直接复用。"""
+    return frozenset(normalize_access_list(list(access_items)))
+
+
+def _get_access_set(access_list: object) -> frozenset[str]:
+    """获取访问列表对应的集合，用于 O(1) 成员判断。"""
+    if not isinstance(access_list, list):
+        return frozenset()
+    try:
+        return _build_access_set(tuple(access_list))
+    except TypeError:
+        # 列表中混入不可哈希的配置项时退回逐项标准化
+        return frozenset(normalize_access_list(access_list))
+
+
+@lru_cache(maxsize=4)
+def _build_admin_user_set(admin_users: tuple[object, ...]) -> frozenset[str]:
+    """按管理员配置内容缓存字符串 ID 集合。"""
+    return frozenset(str(user_id).strip() for user_id in admin_users if str(user_id).strip())
+
+
+def is_admin_user(admin_users: object, user_id: object) -> bool:
+    """判断用户是否在管理员列表中，兼容列表与逗号分隔字符串两种配置写法。"""
+    if user_id is None:
+        return False
+    if isinstance(admin_users, str):
+        admin_items: tuple[object, ...] = tuple(admin_users.split(","))
+    elif isinstance(admin_users, list):
+        admin_items = tuple(admin_users)
+    else:
+        return False
+    try:
+        admin_set: frozenset[str] = _build_admin_user_set(admin_items)
+    except TypeError:
+        return False
+    return str(user_id) in admin_set
 
 
 def build_target_context_id(target_id: object, scope: str) -> str:
@@ -59,12 +100,11 @@ def is_context_allowed(mode: object, access_list: object, stream_id: str) -> boo
     """根据黑白名单配置判断聊天流是否允许访问。"""
     normalized_mode: str = normalize_access_mode(mode)
     normalized_stream_id: str = normalize_context_id(stream_id)
-    normalized_access_list: list[str] = normalize_access_list(access_list)
 
     if not normalized_stream_id:
         return normalized_mode == _MODE_BLACKLIST
 
-    matched: bool = normalized_stream_id in normalized_access_list
+    matched: bool = normalized_stream_id in _get_access_set(access_list)
     if normalized_mode == _MODE_WHITELIST:
         return matched
     return not matched
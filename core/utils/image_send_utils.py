@@ -8,11 +8,12 @@ import base64
 import binascii
 import html
 import re
-from typing import Tuple, Callable
+from typing import Awaitable, Callable, Tuple, Union
 
 from src.common.logger import get_logger
 
-from .shared_constants import BASE64_IMAGE_PREFIXES
+from .image_utils import get_download_executor
+from .shared_constants import BASE64_IMAGE_MAGIC
 
 logger = get_logger("mais_art.image_send")
 
@@ -48,7 +49,7 @@ def _looks_like_image_base64(payload: str) -> bool:
         return False
     if not _BASE64_BODY_PATTERN.fullmatch(normalized):
         return False
-    if normalized.startswith(BASE64_IMAGE_PREFIXES):
+    if normalized[:4] in BASE64_IMAGE_MAGIC:
         return True
 
     try:
@@ -94,7 +95,7 @@ def _extract_first_url(raw: str) -> str:
 
 async def resolve_image_data(
     image_data: str,
-    download_fn: Callable[[str], Tuple[bool, str]],
+    download_fn: Callable[[str], Union[Tuple[bool, str], Awaitable[Tuple[bool, str]]]],
     log_prefix: str = "",
 ) -> Tuple[bool, str]:
     """将图片数据统一为 base64 格式
@@ -104,13 +105,14 @@ async def resolve_image_data(
 
     Args:
         image_data: base64 字符串或图片 URL
-        download_fn: 同步下载函数，签名 (url) -> (success, base64_or_error)
+        download_fn: 下载函数，签名 (url) -> (success, base64_or_error)；
+            协程函数直接在事件循环中等待，同步函数放入下载线程池执行
         log_prefix: 日志前缀
 
     Returns:
         (success, base64_data_or_error_message)
     """
-    if image_data.startswith(BASE64_IMAGE_PREFIXES):
+    if image_data[:4] in BASE64_IMAGE_MAGIC:
         return True, image_data
 
     raw_candidate = image_data.strip()
@@ -138,7 +140,11 @@ async def resolve_image_data(
 
     # URL: 下载并转为 base64
     try:
-        encode_success, encode_result = await asyncio.to_thread(download_fn, image_url)
+        if asyncio.iscoroutinefunction(download_fn):
+            encode_success, encode_result = await download_fn(image_url)
+        else:
+            loop = asyncio.get_running_loop()
+            encode_success, encode_result = await loop.run_in_executor(get_download_executor(), download_fn, image_url)
         if encode_success:
             return True, encode_result
         else:
@@ -1,14 +1,84 @@
+import asyncio
 import base64
+import binascii
 import urllib.request
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, List
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # type: ignore[assignment]
+
+try:
+    import requests
+except ImportError:
+    requests = None  # type: ignore[assignment]
+
 from src.common.logger import get_logger
 from maim_message import Seg
 
 logger = get_logger("mais_art.image")
 
+# 插件共享的 HTTP 会话（图片下载、提示词优化等；惰性创建，插件卸载时关闭），复用连接池与 DNS 缓存
+_HTTP_SESSION: Optional["aiohttp.ClientSession"] = None
+_DOWNLOAD_CHUNK_SIZE = 65536
+_DOWNLOAD_TIMEOUT_SECONDS = 180
+# 按 Content-Length 预分配编码缓冲的上限（字节）：响应头来自第三方，超过该值时不信任，改为边下载边扩容
+_PREALLOCATE_MAX_BYTES = 32 * 1024 * 1024
+# 同步下载（data URI、SOCKS 代理、未安装 aiohttp）专用的有界线程池：首次使用时创建，插件卸载时关闭
+_DOWNLOAD_EXECUTOR: Optional[ThreadPoolExecutor] = None
+# 从消息纯文本中提取图片 picid
+_PICID_PATTERN = re.compile(r"picid:([a-zA-Z0-9-]+)")
+
+
+def get_http_session() -> "aiohttp.ClientSession":
+    """获取插件共享的 HTTP 会话，已关闭时重新创建（默认超时按图片下载设置，其他用途请按请求传入 timeout）"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        _HTTP_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=_DOWNLOAD_TIMEOUT_SECONDS),
+        )
+    return _HTTP_SESSION
+
+
+def _write_at(buf: bytearray, pos: int, data: bytes) -> int:
+    """把 data 写入 buf 的 pos 处（预分配空间足够时原地覆盖，不足时扩容），返回新的写入位置"""
+    end = pos + len(data)
+    if end <= len(buf):
+        buf[pos:end] = data
+    else:
+        buf[pos:] = data
+    return end
+
+
+async def close_http_session() -> None:
+    """关闭共享的 HTTP 会话（插件卸载时调用）"""
+    global _HTTP_SESSION
+    session, _HTTP_SESSION = _HTTP_SESSION, None
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def get_download_executor() -> ThreadPoolExecutor:
+    """获取图片同步下载线程池（不存在时创建），多个聊天流并发出图时复用线程，避免默认执行器无限扩张"""
+    global _DOWNLOAD_EXECUTOR
+    if _DOWNLOAD_EXECUTOR is None:
+        _DOWNLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="selfie_painter_dl")
+    return _DOWNLOAD_EXECUTOR
+
+
+def shutdown_download_executor() -> None:
+    """关闭图片同步下载线程池（插件卸载时调用），不等待进行中的下载"""
+    global _DOWNLOAD_EXECUTOR
+    executor, _DOWNLOAD_EXECUTOR = _DOWNLOAD_EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
 class ImageProcessor:
     """图片处理工具类"""
 
@@ -54,7 +124,7 @@ class ImageProcessor:
             text = self._get_processed_plain_text()
             picid = None
             if text:
-                match = re.search(r'picid:([a-zA-Z0-9-]+)', text)
+                match = _PICID_PATTERN.search(text)
                 if match:
                     picid = match.group(1)
                     logger.info(f"{self.log_prefix} 从消息文本提取到 picid: {picid}")
@@ -134,11 +204,14 @@ class ImageProcessor:
             else:
                 # 处理普通HTTP URL
                 if proxy_url:
-                    import requests
+                    if requests is None:
+                        error_msg = "requests 未安装，无法通过代理下载图片"
+                        logger.error(f"{self.log_prefix} (B64) {error_msg}")
+                        return False, error_msg
                     logger.info(f"{self.log_prefix} (B64) 下载HTTP图片 (proxy: {proxy_url})")
                     resp = requests.get(image_url, timeout=180, proxies={"http": proxy_url, "https": proxy_url})
                     if resp.status_code == 200:
-                        base64_encoded_image = base64.b64encode(resp.content).decode("utf-8")
+                        base64_encoded_image = binascii.b2a_base64(resp.content, newline=False).decode("ascii")
                         logger.info(f"{self.log_prefix} (B64) 图片下载编码完成. Base64长度: {len(base64_encoded_image)}")
                         return True, base64_encoded_image
                     else:
@@ -150,7 +223,7 @@ class ImageProcessor:
                     with urllib.request.urlopen(image_url, timeout=180) as response:
                         if response.status == 200:
                             image_bytes = response.read()
-                            base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+                            base64_encoded_image = binascii.b2a_base64(image_bytes, newline=False).decode("ascii")
                             logger.info(f"{self.log_prefix} (B64) 图片下载编码完成. Base64长度: {len(base64_encoded_image)}")
                             return True, base64_encoded_image
                         else:
@@ -162,6 +235,60 @@ class ImageProcessor:
             logger.error(f"{self.log_prefix} (B64) 处理图片时错误: {e!r}", exc_info=True)
             return False, f"处理图片时发生错误: {str(e)[:50]}"
 
+    async def download_and_encode_base64_async(self, image_url: str, proxy_url: str = None) -> Tuple[bool, str]:
+        """异步下载图片或处理Base64数据URL
+
+        使用共享的 aiohttp 会话流式读取，不占用线程池；data URI、SOCKS 代理或 aiohttp 不可用时，
+        回退到同步实现并在有界的下载线程池中执行。
+
+        Args:
+            image_url: 图片 URL 或 data:image/ 数据 URL
+            proxy_url: 代理地址（如 http://127.0.0.1:7890），为空则直连
+        """
+        if (
+            aiohttp is None
+            or image_url.startswith('data:image/')
+            or (proxy_url and not proxy_url.lower().startswith(("http://", "https://")))
+        ):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                get_download_executor(), self.download_and_encode_base64, image_url, proxy_url
+            )
+
+        logger.info(f"{self.log_prefix} (B64) 异步下载HTTP图片: {image_url[:50]}... (proxy: {proxy_url or '无'})")
+        try:
+            session = get_http_session()
+            async with session.get(image_url, proxy=proxy_url or None) as resp:
+                if resp.status != 200:
+                    error_msg = f"下载图片失败 (状态: {resp.status})"
+                    logger.error(f"{self.log_prefix} (B64) {error_msg} URL: {image_url[:30]}...")
+                    return False, error_msg
+
+                # 边下载边编码：每次只编码 3 的倍数字节，余下 1~2 字节并入下一块，不保留整份原图
+                # 已知 Content-Length（且未压缩传输、不超过上限）时按编码后长度一次性预分配，原地写入，避免反复扩容
+                content_length = resp.content_length or 0
+                if resp.headers.get("Content-Encoding") or content_length > _PREALLOCATE_MAX_BYTES:
+                    content_length = 0
+                encoded = bytearray(4 * ((content_length + 2) // 3))
+                pos = 0
+                carry = b""
+                async for chunk in resp.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                    if carry:
+                        chunk = carry + chunk
+                    cut = len(chunk) - len(chunk) % 3
+                    pos = _write_at(encoded, pos, binascii.b2a_base64(memoryview(chunk)[:cut], newline=False))
+                    carry = chunk[cut:]
+                if carry:
+                    pos = _write_at(encoded, pos, binascii.b2a_base64(carry, newline=False))
+                del encoded[pos:]
+
+            base64_encoded_image = encoded.decode("ascii")
+            logger.info(f"{self.log_prefix} (B64) 图片下载编码完成. Base64长度: {len(base64_encoded_image)}")
+            return True, base64_encoded_image
+        except Exception as e:
+            logger.error(f"{self.log_prefix} (B64) 处理图片时错误: {e!r}", exc_info=True)
+            return False, f"处理图片时发生错误: {str(e)[:50]}"
+
     def process_api_response(self, result) -> Optional[str]:
         """统一处理API响应，提取图片数据"""
         try:
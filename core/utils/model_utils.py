@@ -3,11 +3,16 @@
 提供模型配置获取、负面提示词合并、Gemini/Zai 尺寸注入等公共方法，
 消除 pic_action / pic_command / auto_selfie_task / api_clients 中的重复逻辑。
 """
-from typing import Dict, Any, Optional, Callable
+import functools
+from collections import ChainMap
+from typing import Dict, Any, Optional, Callable, Mapping
 from src.common.logger import get_logger
 
 logger = get_logger("mais_art.model_utils")
 
+# 默认配置模板中的占位 API 密钥片段
+_PLACEHOLDER_API_KEY_MARKERS = ("YOUR_API_KEY_HERE", "xxxxxxxxxxxxxx")
+
 
 def get_model_config(
     config_getter: Callable,
@@ -70,36 +75,50 @@ def get_model_config(
     return None
 
 
+@functools.lru_cache(maxsize=32)
+def is_placeholder_api_key(api_key: str) -> bool:
+    """判断 API 密钥是否仍是配置模板中的占位值（结果按密钥缓存，热路径只需一次字典查询）"""
+    return any(marker in api_key for marker in _PLACEHOLDER_API_KEY_MARKERS)
+
+
 def merge_negative_prompt(
-    model_config: Dict[str, Any],
+    model_config: Mapping[str, Any],
     extra_negative: str,
-) -> Dict[str, Any]:
+) -> Mapping[str, Any]:
     """
     将额外的负面提示词合并进 model_config。
-    返回浅拷贝，不修改原 dict。
+    返回以覆盖层包装的只读视图（ChainMap），不复制也不修改原 dict。
     """
     if not extra_negative:
         return model_config
-    config = dict(model_config)
-    existing = config.get("negative_prompt_add", "")
-    if existing:
-        config["negative_prompt_add"] = f"{existing}, {extra_negative}"
-    else:
-        config["negative_prompt_add"] = extra_negative
-    return config
+    existing = model_config.get("negative_prompt_add", "")
+    merged = f"{existing}, {extra_negative}" if existing else extra_negative
+    return ChainMap({"negative_prompt_add": merged}, model_config)
+
+
+def _inject_llm_size(model_config: Mapping[str, Any], llm_original_size: str) -> Mapping[str, Any]:
+    """返回注入了 _llm_original_size 的覆盖层视图。"""
+    return ChainMap({"_llm_original_size": llm_original_size}, model_config)
+
+
+# 按 API 格式分派的模型配置预处理器，新增需要特殊处理的格式时在此登记即可
+_FORMAT_PREPROCESSORS: Dict[str, Callable[[Mapping[str, Any], str], Mapping[str, Any]]] = {
+    "gemini": _inject_llm_size,
+    "zai": _inject_llm_size,
+}
 
 
 def inject_llm_original_size(
-    model_config: Dict[str, Any],
+    model_config: Mapping[str, Any],
     llm_original_size: str,
-) -> Dict[str, Any]:
+) -> Mapping[str, Any]:
     """
     对 Gemini/Zai 格式，注入 _llm_original_size。
-    返回浅拷贝，不修改原 dict。非 Gemini/Zai 格式时直接返回原 dict。
+    返回覆盖层视图（ChainMap），不修改原 dict。非 Gemini/Zai 格式时直接返回原 dict。
     """
-    api_format = model_config.get("format", "openai")
-    if api_format in ("gemini", "zai") and llm_original_size:
-        config = dict(model_config)
-        config["_llm_original_size"] = llm_original_size
-        return config
-    return model_config
+    if not llm_original_size:
+        return model_config
+    preprocessor = _FORMAT_PREPROCESSORS.get(model_config.get("format", "openai"))
+    if preprocessor is None:
+        return model_config
+    return preprocessor(model_config, llm_original_size)
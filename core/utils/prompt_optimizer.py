@@ -5,15 +5,35 @@
 纯净调用，不带人设和回复风格。
 """
 
-from typing import Optional, Tuple
+import asyncio
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 import aiohttp
 
 from src.common.logger import get_logger
-from src.plugin_system.apis import llm_api
+
+from .image_utils import get_http_session
 
 logger = get_logger("mais_art.optimizer")
 
+# 优化结果缓存：相同模式、相同后端、相同描述在有效期内直接复用，不再调用 LLM
+_RESPONSE_CACHE_MAXSIZE = 512
+_RESPONSE_CACHE_TTL_SECONDS = 3600.0
+# LLM 响应清理：开头的 "Output:" / "Prompt:" 前缀（可能连续出现）与成对的首尾引号
+_RESPONSE_PREFIX_PATTERN = re.compile(r"^(?:(?:output|prompt)\s*:\s*)+", re.IGNORECASE)
+_RESPONSE_QUOTE_PATTERN = re.compile(r"^([\"'])(.*)\1$", re.DOTALL)
+# 已是英文 tag 串的输入特征词：命中任一即视为现成 prompt，跳过 LLM
+_PROMPT_MARKER_TAGS = ("masterpiece", "best quality", "1girl", "1boy")
+# 与 OPTIMIZER_SYSTEM_PROMPT 要求的结尾质量词保持一致
+_QUALITY_TAGS = ("masterpiece", "best quality", "high resolution")
+# 缓存键归一化时去掉的首尾标点（含全角），这些字符不影响描述含义
+_CACHE_KEY_STRIP_CHARS = " \t\r\n。，、！？；：~…,.!?;:"
+
 # 提示词优化系统提示词（before 模式：中文/简短描述 → 完整英文 prompt）
 OPTIMIZER_SYSTEM_PROMPT = """You are a professional AI art prompt engineer. Your task is to convert user descriptions into high-quality English prompts for image generation models (Stable Diffusion, DALL-E, etc.).
 
@@ -120,6 +140,43 @@ Output: coffee shop interior, rainy window, warm cozy atmosphere, soft indoor li
 Now convert the following description to English scene tags:"""
 
 
+def _looks_like_prompt(text: str) -> bool:
+    """判断输入是否已经是英文 tag 串（纯 ASCII、逗号分隔且含常见 prompt 标记词）"""
+    if not text.isascii() or "," not in text:
+        return False
+    lowered = text.lower()
+    return any(tag in lowered for tag in _PROMPT_MARKER_TAGS)
+
+
+def _ensure_quality_tags(prompt: str) -> str:
+    """为现成 prompt 补齐缺失的结尾质量词"""
+    lowered = prompt.lower()
+    missing = [tag for tag in _QUALITY_TAGS if lowered.find(tag) < 0]
+    if not missing:
+        return prompt
+    return f"{prompt.rstrip().rstrip(',')}, {', '.join(missing)}"
+
+
+def _normalize_cache_key(text: str) -> str:
+    """把描述归一化为缓存键：全角/半角统一、空白折叠、去掉首尾标点
+
+    只做不改变语义的规范化，让"海边的女孩！"与"海边的女孩"这类输入命中同一缓存。
+    """
+    normalized = unicodedata.normalize("NFKC", text)
+    return " ".join(normalized.split()).strip(_CACHE_KEY_STRIP_CHARS)
+
+
+@lru_cache(maxsize=256)
+def _build_llm_prompt(system_prompt: str, user_input: str, normalize_mode: bool) -> str:
+    """拼接主 LLM 的完整 prompt（normalize_mode 直接输入 tag 串，否则用 Input/Output 格式）
+
+    系统提示词较长，按 (系统提示词, 输入, 模式) 缓存拼接结果，重复描述不再重新分配大字符串。
+    """
+    if normalize_mode:
+        return f"{system_prompt}\n\n{user_input}"
+    return f"{system_prompt}\n\nInput: {user_input}\nOutput:"
+
+
 class PromptOptimizer:
     """提示词优化器
 
@@ -131,11 +188,48 @@ class PromptOptimizer:
     def __init__(self, log_prefix: str = "[PromptOptimizer]"):
         self.log_prefix = log_prefix
         self._model_config = None
-
-    def _get_model_config(self):
+        # 保护模型配置的首次获取，避免冷启动时并发请求重复查询可用模型
+        self._model_config_lock = asyncio.Lock()
+        # 缓存键 -> (写入时间, 优化结果)，按写入顺序淘汰
+        self._response_cache: "OrderedDict[Tuple[str, ...], Tuple[float, str]]" = OrderedDict()
+        # 进行中的优化请求：相同缓存键的并发调用等待同一次 LLM 调用
+        self._inflight: Dict[Tuple[str, ...], "asyncio.Future[Optional[str]]"] = {}
+
+    def clear_cache(self) -> None:
+        """清空优化结果缓存"""
+        self._response_cache.clear()
+
+    def _get_cached_response(self, key: Tuple[str, ...]) -> Optional[str]:
+        """读取未过期的缓存结果"""
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, optimized = entry
+        if time.monotonic() - stored_at > _RESPONSE_CACHE_TTL_SECONDS:
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return optimized
+
+    def _store_cached_response(self, key: Tuple[str, ...], optimized: str) -> None:
+        """写入缓存结果，超出容量时淘汰最久未使用的条目"""
+        self._response_cache[key] = (time.monotonic(), optimized)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > _RESPONSE_CACHE_MAXSIZE:
+            self._response_cache.popitem(last=False)
+
+    async def _get_model_config(self):
         """获取可用的 MaiBot LLM 模型配置"""
-        if self._model_config is None:
+        if self._model_config is not None:
+            return self._model_config
+        async with self._model_config_lock:
+            # 双重检查：等待锁期间其他协程可能已完成获取
+            if self._model_config is not None:
+                return self._model_config
             try:
+                # 按需导入：只在真正需要 MaiBot 主 LLM 时才加载 llm_api
+                from src.plugin_system.apis import llm_api
+
                 models = llm_api.get_available_models()
                 # 使用 replyer 模型（首要回复模型）
                 if "replyer" in models:
@@ -208,17 +302,17 @@ class PromptOptimizer:
         }
 
         try:
+            # 复用插件共享会话：并发的优化请求共用连接池，不再每次新建会话和 TLS 连接
             timeout = aiohttp.ClientTimeout(total=60)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, json=payload, headers=headers) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        content: str = data["choices"][0]["message"]["content"]
-                        return True, content
-                    else:
-                        error_text = await resp.text()
-                        logger.error(f"{self.log_prefix} 自定义API返回错误 (HTTP {resp.status}): {error_text[:200]}")
-                        return False, f"自定义API错误: HTTP {resp.status}"
+            async with get_http_session().post(url, json=payload, headers=headers, timeout=timeout) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    content: str = data["choices"][0]["message"]["content"]
+                    return True, content
+                else:
+                    error_text = await resp.text()
+                    logger.error(f"{self.log_prefix} 自定义API返回错误 (HTTP {resp.status}): {error_text[:200]}")
+                    return False, f"自定义API错误: HTTP {resp.status}"
         except aiohttp.ClientError as e:
             logger.error(f"{self.log_prefix} 自定义API连接失败: {e}")
             return False, f"自定义API连接失败: {e}"
@@ -270,8 +364,61 @@ class PromptOptimizer:
             mode_label = "提示词"
         user_input = user_description.strip()
 
+        # 普通模式下用户直接给出英文 tag 串时无需 LLM 改写，只补齐质量词
+        if not normalize_mode and not scene_only and _looks_like_prompt(user_input):
+            logger.info(f"{self.log_prefix} 输入已是英文提示词，跳过LLM优化: {user_input[:50]}...")
+            return True, _ensure_quality_tags(user_input)
+
+        use_custom_api = self._has_custom_api(custom_api_base_url, custom_api_key, custom_api_model)
+        backend = f"{custom_api_base_url.strip()}|{custom_api_model.strip()}" if use_custom_api else "maibot"
+        cache_key = (mode_label, backend, _normalize_cache_key(user_input))
+
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"{self.log_prefix} 命中{mode_label}优化缓存: {user_input[:50]}...")
+            return True, cached
+
+        pending = self._inflight.get(cache_key)
+        if pending is None:
+            pending = asyncio.ensure_future(
+                self._run_optimization(
+                    system_prompt,
+                    mode_label,
+                    user_input,
+                    normalize_mode,
+                    use_custom_api,
+                    custom_api_base_url,
+                    custom_api_key,
+                    custom_api_model,
+                )
+            )
+            self._inflight[cache_key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        else:
+            logger.info(f"{self.log_prefix} 合并相同描述的并发{mode_label}优化请求")
+
+        # shield：发起方被取消时，不影响正在等待同一结果的其他调用
+        optimized = await asyncio.shield(pending)
+        if optimized is None:
+            # 降级：直接返回原始描述（不写入缓存，下次仍会重试优化）
+            return True, user_description
+        self._store_cached_response(cache_key, optimized)
+        return True, optimized
+
+    async def _run_optimization(
+        self,
+        system_prompt: str,
+        mode_label: str,
+        user_input: str,
+        normalize_mode: bool,
+        use_custom_api: bool,
+        custom_api_base_url: str,
+        custom_api_key: str,
+        custom_api_model: str,
+    ) -> Optional[str]:
+        """实际调用 LLM 优化提示词，失败时返回 None 由调用方降级为原始描述"""
         # ---- 路径 1: 自定义 API ----
-        if self._has_custom_api(custom_api_base_url, custom_api_key, custom_api_model):
+        if use_custom_api:
             logger.info(
                 f"{self.log_prefix} 使用自定义API优化{mode_label} (模型: {custom_api_model}): {user_input[:50]}..."
             )
@@ -285,25 +432,22 @@ class PromptOptimizer:
             if success and response:
                 optimized = self._clean_response(response)
                 logger.info(f"{self.log_prefix} 自定义API优化成功 (模型: {custom_api_model}): {optimized[:80]}...")
-                return True, optimized
+                return optimized
             else:
                 logger.warning(f"{self.log_prefix} 自定义API优化失败，降级使用原始描述: {user_input[:50]}...")
-                return True, user_description
+                return None
 
         # ---- 路径 2: MaiBot 主 LLM (回退) ----
-        model_config = self._get_model_config()
+        model_config = await self._get_model_config()
         if not model_config:
             # 降级：直接返回原始描述
             logger.warning(f"{self.log_prefix} 无可用模型，降级使用原始描述")
-            return True, user_description
+            return None
 
         try:
-            # 构建完整 prompt（normalize_mode 直接输入 tag 串，否则用 Input/Output 格式）
-            full_prompt = (
-                f"{system_prompt}\n\n{user_input}"
-                if normalize_mode
-                else f"{system_prompt}\n\nInput: {user_input}\nOutput:"
-            )
+            from src.plugin_system.apis import llm_api
+
+            full_prompt = _build_llm_prompt(system_prompt, user_input, normalize_mode)
 
             logger.info(f"{self.log_prefix} 使用MaiBot主LLM优化{mode_label}: {user_input[:50]}...")
 
@@ -318,50 +462,39 @@ class PromptOptimizer:
                 # 清理响应（移除可能的前缀/后缀）
                 optimized = self._clean_response(response)
                 logger.info(f"{self.log_prefix} 优化成功 (模型: {model_name}): {optimized[:80]}...")
-                return True, optimized
+                return optimized
             else:
                 logger.warning(f"{self.log_prefix} LLM 返回空响应，降级使用原始描述: {user_input[:50]}...")
-                return True, user_description
+                return None
 
         except Exception as e:
             logger.error(f"{self.log_prefix} 优化失败: {e}，使用原始描述: {user_input[:50]}...")
             # 降级：返回原始描述
-            return True, user_description
+            return None
 
     def _clean_response(self, response: str) -> str:
         """清理 LLM 响应
 
         移除可能的前缀、后缀、引号等
         """
-        result = response.strip()
-
-        # 移除可能的 "Output:" 前缀
-        prefixes_to_remove = ["Output:", "output:", "Prompt:", "prompt:"]
-        for prefix in prefixes_to_remove:
-            if result.startswith(prefix):
-                result = result[len(prefix) :].strip()
+        result = _RESPONSE_PREFIX_PATTERN.sub("", response.strip(), count=1)
 
         # 移除首尾引号
-        if (result.startswith('"') and result.endswith('"')) or (result.startswith("'") and result.endswith("'")):
-            result = result[1:-1]
+        quoted = _RESPONSE_QUOTE_PATTERN.match(result)
+        if quoted:
+            result = quoted.group(2)
 
         # 移除多余换行
-        result = " ".join(result.split())
-
-        return result
+        return " ".join(result.split())
 
 
-# 全局优化器实例
-_optimizer_instance: Optional[PromptOptimizer] = None
+# 全局优化器实例：导入时即创建，所有调用方共享同一份响应缓存与进行中请求表
+_optimizer_instance = PromptOptimizer()
 
 
 def get_optimizer(log_prefix: str = "[PromptOptimizer]") -> PromptOptimizer:
     """获取提示词优化器实例（单例）"""
-    global _optimizer_instance
-    if _optimizer_instance is None:
-        _optimizer_instance = PromptOptimizer(log_prefix)
-    else:
-        _optimizer_instance.log_prefix = log_prefix
+    _optimizer_instance.log_prefix = log_prefix
     return _optimizer_instance
 
 
@@ -7,13 +7,32 @@
 """
 
 import asyncio
+import functools
+import heapq
+import itertools
 import time as time_module
-from typing import Callable, Awaitable, Any, Optional
+from dataclasses import dataclass
+from typing import Callable, Awaitable, Any, Dict, List, Optional, Set, Tuple
 
 from src.common.logger import get_logger
+from src.config.config import global_config
+from src.plugin_system.apis import message_api
 
 logger = get_logger("mais_art.recall")
 
+# 平台撤回命令候选（不同适配器命名不同），按顺序尝试
+_RECALL_COMMAND_CANDIDATES = ("DELETE_MSG", "delete_msg", "RECALL_MSG", "recall_msg")
+# 单条撤回命令的超时（秒）
+_RECALL_COMMAND_TIMEOUT = 10.0
+# 各平台上次撤回成功的命令（platform -> 命令），后续撤回优先尝试，避免每次都先走几次失败的命令
+_working_recall_commands: Dict[str, str] = {}
+# 各平台适配器明确不支持的撤回命令（如 OneBot retcode 1404），进程生命周期内不再尝试
+_dead_recall_commands: Dict[str, Set[str]] = {}
+_UNSUPPORTED_RECALL_RETCODES = frozenset({1404})
+_UNSUPPORTED_RECALL_HINTS = (
+    "unknown action", "unknown command", "unsupported", "not support", "不支持", "未知命令", "未知的命令",
+)
+
 # ==================== 消息匹配工具 ====================
 
 def _is_image_message(msg) -> bool:
@@ -79,115 +98,238 @@ def _extract_user_id(msg) -> Optional[str]:
     return None
 
 
-def _get_message_time(msg) -> float:
-    """获取消息的时间戳"""
-    t = getattr(msg, "time", None)
-    if t is not None:
-        return float(t)
-    t = getattr(msg, "timestamp", None)
-    if t is not None:
-        return float(t)
-    return 0.0
+def _as_platform_id(value) -> Optional[str]:
+    """把平台真实消息 ID 规范为字符串；不是纯数字 ID（含占位 ID）时返回 None"""
+    value_type = type(value)
+    if value_type is int:
+        return str(value)
+    if value_type is str and value and value.isdecimal():
+        return value
+    return None
+
+
+def extract_sent_message_id(send_result: Any) -> Optional[str]:
+    """从 send_image 等发送接口的返回值中取出真实消息 ID
+
+    部分宿主版本只返回 bool，此时返回 None，由撤回流程回退到数据库查找。
+    """
+    if send_result is None or isinstance(send_result, bool):
+        return None
+    if isinstance(send_result, dict):
+        return _as_platform_id(send_result.get("message_id"))
+    message_id = getattr(send_result, "message_id", None)
+    if message_id is None:
+        message_info = getattr(send_result, "message_info", None)
+        message_id = getattr(message_info, "message_id", None)
+    return _as_platform_id(message_id)
 
 
 # ==================== 核心逻辑 ====================
 
+@functools.lru_cache(maxsize=1)
+def _get_bot_id() -> str:
+    """Bot 自身账号（运行期不变，只读取一次）"""
+    return str(global_config.bot.qq_account)
+
+
 async def _find_bot_image_message_id(
     chat_id: str,
     send_timestamp: float,
     log_prefix: str,
-    poll_attempts: int = 5,
-    poll_interval: float = 0.5,
+    timeout: float = 3.0,
+    initial_interval: float = 0.1,
+    max_interval: float = 1.0,
 ) -> Optional[str]:
-    """轮询查找 Bot 发送的图片消息 ID
+    """以指数退避轮询查找 Bot 发送的图片消息 ID
 
     Args:
         chat_id: 聊天流 ID
         send_timestamp: 图片发送时的时间戳
         log_prefix: 日志前缀
-        poll_attempts: 轮询次数
-        poll_interval: 每次轮询间隔（秒）
+        timeout: 轮询总时长上限（秒）
+        initial_interval: 首次轮询间隔（秒），之后每次翻倍
+        max_interval: 轮询间隔上限（秒）
 
     Returns:
         消息 ID 字符串，找不到返回 None
     """
-    from src.plugin_system.apis import message_api
-    from src.config.config import global_config
-
-    bot_id = str(global_config.bot.qq_account)
+    bot_id = _get_bot_id()
     placeholder_id = None
+    deadline = time_module.time() + timeout
+    interval = initial_interval
+    attempt = 0
 
-    for attempt in range(poll_attempts):
+    while True:
         try:
+            # 时间窗口直接交给查询过滤（早于发送时间 1 秒以上的消息不会返回），Python 侧无需再比对时间
             messages = message_api.get_messages_by_time_in_chat(
                 chat_id=chat_id,
-                start_time=send_timestamp - 2,
+                start_time=send_timestamp - 1,
                 end_time=time_module.time() + 1,
                 limit=10,
                 limit_mode="latest",
             )
         except Exception as e:
-            logger.debug(f"{log_prefix} 查询消息失败 (第{attempt + 1}次): {e}")
-            await asyncio.sleep(poll_interval)
-            continue
+            logger.debug("%s 查询消息失败 (第%s次): %s", log_prefix, attempt + 1, e)
+            messages = []
 
-        # 倒序遍历（最新的在前）
+        # 倒序遍历（最新的在前），先做开销小、过滤掉最多消息的发送者判断，再检查图片特征
         for msg in reversed(messages):
-            # 只匹配图片消息
-            if not _is_image_message(msg):
-                continue
-
-            # 只匹配 Bot 自己发的
-            sender_id = _extract_user_id(msg)
-            if sender_id and sender_id != bot_id:
-                continue
-            if not sender_id:
-                # 无法确认发送者，宁可不撤回也不误撤回
-                continue
-
-            # 检查时间：必须在发送时间之后
-            msg_time = _get_message_time(msg)
-            if msg_time > 0 and msg_time < send_timestamp - 1:
+            # 只匹配 Bot 自己发的；无法确认发送者时宁可不撤回也不误撤回
+            if _extract_user_id(msg) != bot_id:
                 continue
 
-            mid = str(getattr(msg, "message_id", ""))
-            if not mid:
+            # 只匹配图片消息
+            if not _is_image_message(msg):
                 continue
 
             # 优先选真实 ID（纯数字），占位 ID 作为后备
-            if mid.isdigit():
+            raw_mid = getattr(msg, "message_id", None)
+            mid = _as_platform_id(raw_mid)
+            if mid is not None:
                 logger.info(
-                    f"{log_prefix} 找到目标消息 ID: {mid} (第{attempt + 1}次轮询)"
+                    "%s 找到目标消息 ID: %s (第%s次轮询)", log_prefix, mid, attempt + 1
                 )
                 return mid
-            elif not mid.startswith("send_api_"):
+
+            mid = str(raw_mid) if raw_mid is not None else ""
+            if not mid:
+                continue
+            if not mid.startswith("send_api_"):
                 # 非标准格式但也非占位符，可以尝试
                 logger.info(
-                    f"{log_prefix} 找到非标准消息 ID: {mid} (第{attempt + 1}次轮询)"
+                    "%s 找到非标准消息 ID: %s (第%s次轮询)", log_prefix, mid, attempt + 1
                 )
                 return mid
             else:
                 placeholder_id = mid
 
-        if attempt < poll_attempts - 1:
-            await asyncio.sleep(poll_interval)
+        attempt += 1
+        remaining = deadline - time_module.time()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
 
     if placeholder_id:
-        logger.warning(f"{log_prefix} 仅找到占位消息 ID: {placeholder_id}")
+        logger.warning("%s 仅找到占位消息 ID: %s", log_prefix, placeholder_id)
     else:
-        logger.warning(f"{log_prefix} 未找到 Bot 的图片消息 ID")
+        logger.warning("%s 未找到 Bot 的图片消息 ID", log_prefix)
 
     return placeholder_id
 
 
+# ==================== 撤回调度 ====================
+
+@dataclass
+class _RecallJob:
+    """一条待执行的撤回"""
+
+    chat_id: str
+    send_timestamp: float
+    message_id: str
+    send_command_fn: Callable[..., Awaitable[Any]]
+    log_prefix: str
+    platform: str = ""
+
+
+# 待撤回的消息按到期时间组成小顶堆，由单个后台任务依次处理
+_recall_heap: List[Tuple[float, int, _RecallJob]] = []
+_recall_seq = itertools.count()
+_recall_wakeup: Optional[asyncio.Event] = None
+_recall_worker_task: Optional["asyncio.Task[None]"] = None
+# 正在解析消息 ID 的短任务（保留引用，防止被回收，卸载时统一取消）
+_resolve_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _enqueue_recall(job: _RecallJob, fire_at: float) -> None:
+    """把撤回加入调度堆，必要时启动调度任务"""
+    global _recall_wakeup, _recall_worker_task
+
+    heapq.heappush(_recall_heap, (fire_at, next(_recall_seq), job))
+    if _recall_wakeup is None:
+        _recall_wakeup = asyncio.Event()
+    _recall_wakeup.set()
+    if _recall_worker_task is None or _recall_worker_task.done():
+        _recall_worker_task = asyncio.create_task(_recall_worker())
+
+
+async def _recall_worker() -> None:
+    """单一调度任务：睡到最早到期的撤回，依次执行，堆空后退出"""
+    assert _recall_wakeup is not None
+    while _recall_heap:
+        delay = _recall_heap[0][0] - time_module.time()
+        if delay > 0:
+            # 有更早到期的撤回加入时会被唤醒，重新计算等待时间
+            _recall_wakeup.clear()
+            try:
+                await asyncio.wait_for(_recall_wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        _, _, job = heapq.heappop(_recall_heap)
+        try:
+            await _run_recall_job(job)
+        except Exception as e:
+            logger.error("%s 自动撤回异常: %s", job.log_prefix, e)
+
+
+async def _run_recall_job(job: _RecallJob) -> None:
+    """执行一条到期的撤回"""
+    target_message_id = job.message_id
+
+    # 如果之前拿到的是占位 ID，再尝试解析一次真实 ID
+    if target_message_id.startswith("send_api_"):
+        resolved = await _find_bot_image_message_id(
+            job.chat_id, job.send_timestamp, job.log_prefix, timeout=3.0,
+        )
+        if resolved and not resolved.startswith("send_api_"):
+            logger.info("%s 占位 ID 解析为真实 ID: %s", job.log_prefix, resolved)
+            target_message_id = resolved
+
+    # 尝试撤回
+    success = await _try_recall_message(
+        target_message_id, job.send_command_fn, job.log_prefix, job.platform
+    )
+    if not success:
+        logger.warning(
+            "%s 自动撤回失败，消息ID: %s", job.log_prefix, target_message_id
+        )
+
+
+async def shutdown_recall_scheduler() -> None:
+    """插件卸载时调用：取消调度任务和未完成的 ID 解析，丢弃待撤回队列"""
+    global _recall_wakeup, _recall_worker_task
+
+    tasks = list(_resolve_tasks)
+    if _recall_worker_task is not None and not _recall_worker_task.done():
+        tasks.append(_recall_worker_task)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    _resolve_tasks.clear()
+    _recall_heap.clear()
+    _recall_worker_task = None
+    _recall_wakeup = None
+
+
 async def schedule_auto_recall(
     chat_id: str,
     delay_seconds: int,
     log_prefix: str,
     send_command_fn: Callable[..., Awaitable[Any]],
     send_timestamp: float = 0.0,
+    message_id: Optional[str] = None,
+    platform: str = "",
 ):
-    """安排消息自动撤回后台任务
+    """安排消息自动撤回
+
+    先由短任务解析消息 ID，再交给统一的调度任务在到期时撤回，
+    等待中的撤回不各自占用一个长时间休眠的任务。
+    发送时已拿到真实消息 ID 时直接入队，不再等待回执或查询数据库。
 
     Args:
         chat_id: 聊天流 ID
@@ -196,11 +338,21 @@ async def schedule_auto_recall(
         send_command_fn: 发送平台命令的异步函数
         send_timestamp: 图片发送时的时间戳（time.time()），
             0 表示使用当前时间
+        message_id: 发送接口直接返回的真实消息 ID，未知时为 None
+        platform: 消息所在平台，用于按平台记忆可用的撤回命令
     """
     if send_timestamp <= 0:
         send_timestamp = time_module.time()
 
-    async def _recall_task():
+    if message_id:
+        logger.info(
+            "%s 安排自动撤回，延时: %s秒，消息ID: %s（发送时获得）", log_prefix, delay_seconds, message_id
+        )
+        job = _RecallJob(chat_id, send_timestamp, message_id, send_command_fn, log_prefix, platform)
+        _enqueue_recall(job, send_timestamp + delay_seconds)
+        return
+
+    async def _resolve_task():
         try:
             # 等待消息入库
             await asyncio.sleep(1.0)
@@ -211,62 +363,75 @@ async def schedule_auto_recall(
             )
 
             if not target_message_id:
-                logger.warning(f"{log_prefix} 无法获取消息 ID，放弃撤回")
+                logger.warning("%s 无法获取消息 ID，放弃撤回", log_prefix)
                 return
 
             logger.info(
-                f"{log_prefix} 安排自动撤回，延时: {delay_seconds}秒，消息ID: {target_message_id}"
+                "%s 安排自动撤回，延时: %s秒，消息ID: %s", log_prefix, delay_seconds, target_message_id
             )
+            job = _RecallJob(chat_id, send_timestamp, target_message_id, send_command_fn, log_prefix, platform)
+            _enqueue_recall(job, time_module.time() + delay_seconds)
 
-            # 等待撤回延时
-            await asyncio.sleep(delay_seconds)
+        except asyncio.CancelledError:
+            logger.debug("%s 自动撤回任务被取消", log_prefix)
+        except Exception as e:
+            logger.error("%s 自动撤回异常: %s", log_prefix, e)
 
-            # 如果之前拿到的是占位 ID，再尝试解析一次真实 ID
-            if target_message_id.startswith("send_api_"):
-                resolved = await _find_bot_image_message_id(
-                    chat_id, send_timestamp, log_prefix,
-                    poll_attempts=3, poll_interval=1.0,
-                )
-                if resolved and not resolved.startswith("send_api_"):
-                    logger.info(f"{log_prefix} 占位 ID 解析为真实 ID: {resolved}")
-                    target_message_id = resolved
+    task = asyncio.create_task(_resolve_task())
+    _resolve_tasks.add(task)
+    task.add_done_callback(_resolve_tasks.discard)
 
-            # 尝试撤回
-            success = await _try_recall_message(
-                target_message_id, send_command_fn, log_prefix
-            )
-            if not success:
-                logger.warning(
-                    f"{log_prefix} 自动撤回失败，消息ID: {target_message_id}"
-                )
 
-        except asyncio.CancelledError:
-            logger.debug(f"{log_prefix} 自动撤回任务被取消")
-        except Exception as e:
-            logger.error(f"{log_prefix} 自动撤回异常: {e}")
+def _is_unsupported_command_error(error: Exception) -> bool:
+    """判断异常是否表示适配器不认识该命令（确定性失败，重试无意义）"""
+    text = str(error).lower()
+    return any(hint in text for hint in _UNSUPPORTED_RECALL_HINTS)
+
 
-    asyncio.create_task(_recall_task())
+def _mark_recall_command_dead(platform: str, cmd: str, log_prefix: str) -> None:
+    """记录该平台不支持的撤回命令，之后的撤回直接跳过"""
+    dead = _dead_recall_commands.setdefault(platform, set())
+    if cmd not in dead:
+        dead.add(cmd)
+        logger.debug("%s 撤回命令 %s 不受支持，后续跳过", log_prefix, cmd)
+    if _working_recall_commands.get(platform) == cmd:
+        del _working_recall_commands[platform]
 
 
 async def _try_recall_message(
     message_id: str,
     send_command_fn: Callable[..., Awaitable[Any]],
     log_prefix: str,
+    platform: str = "",
 ) -> bool:
-    """尝试撤回消息"""
-    commands = ["DELETE_MSG", "delete_msg", "RECALL_MSG", "recall_msg"]
+    """尝试撤回消息（优先使用该平台上次成功的撤回命令）"""
+    dead = _dead_recall_commands.get(platform, ())
+    commands = [cmd for cmd in _RECALL_COMMAND_CANDIDATES if cmd not in dead]
+    if not commands:
+        # 全部被判定为不支持时（例如适配器重连后更换了实现），重新完整尝试一轮
+        _dead_recall_commands.pop(platform, None)
+        commands = list(_RECALL_COMMAND_CANDIDATES)
+    working = _working_recall_commands.get(platform)
+    if working in commands:
+        commands.remove(working)
+        commands.insert(0, working)
 
     for cmd in commands:
         try:
-            result = await send_command_fn(
-                command_name=cmd,
-                args={"message_id": str(message_id)},
-                storage_message=False,
+            # 撤回在单一调度任务中依次执行，单条命令必须限时，避免卡住后续撤回
+            result = await asyncio.wait_for(
+                send_command_fn(
+                    command_name=cmd,
+                    args={"message_id": str(message_id)},
+                    storage_message=False,
+                ),
+                timeout=_RECALL_COMMAND_TIMEOUT,
             )
             if isinstance(result, bool) and result:
                 logger.info(
-                    f"{log_prefix} 撤回成功，命令: {cmd}，消息ID: {message_id}"
+                    "%s 撤回成功，命令: %s，消息ID: %s", log_prefix, cmd, message_id
                 )
+                _working_recall_commands[platform] = cmd
                 return True
             elif isinstance(result, dict):
                 status = str(result.get("status", "")).lower()
@@ -276,11 +441,19 @@ async def _try_recall_message(
                     or result.get("code") == 0
                 ):
                     logger.info(
-                        f"{log_prefix} 撤回成功，命令: {cmd}，消息ID: {message_id}"
+                        "%s 撤回成功，命令: %s，消息ID: %s", log_prefix, cmd, message_id
                     )
+                    _working_recall_commands[platform] = cmd
                     return True
+                if (
+                    result.get("retcode") in _UNSUPPORTED_RECALL_RETCODES
+                    or result.get("code") in _UNSUPPORTED_RECALL_RETCODES
+                ):
+                    _mark_recall_command_dead(platform, cmd, log_prefix)
         except Exception as e:
-            logger.debug(f"{log_prefix} 撤回命令 {cmd} 失败: {e}")
+            logger.debug("%s 撤回命令 %s 失败: %s", log_prefix, cmd, e)
+            if _is_unsupported_command_error(e):
+                _mark_recall_command_dead(platform, cmd, log_prefix)
             continue
 
     return False
@@ -213,13 +213,14 @@ class RoleReferenceStore:
         }
         self._write_metadata(rhash, metadata)
 
+        self._cleanup_role_dir(rhash, keep_count=max_images)
+
+        # 索引更新与缓存淘汰合并为一次读写，避免连续两次序列化写盘
         index = self._load_index()
         index[role_name] = {"role_hash": rhash, "updated_at": metadata["updated_at"]}
+        self._enforce_cache_limit(index)
         self._save_index(index)
 
-        self._cleanup_role_dir(rhash, keep_count=max_images)
-        self._enforce_cache_limit()
-
         return True, f"已更新角色参考图（{len(image_paths)}张）"
 
     def clear_role(self, role_name: str) -> Tuple[bool, str]:
@@ -348,11 +349,11 @@ class RoleReferenceStore:
             except Exception:
                 continue
 
-    def _enforce_cache_limit(self) -> None:
+    def _enforce_cache_limit(self, index: Dict[str, Any]) -> None:
+        """按更新时间淘汰最旧的角色缓存，直到总大小不超过上限（只修改传入的索引，由调用方保存）"""
         max_cache_mb = int(self.plugin.get_config("search_reference.max_cache_size_mb", 100) or 100)
         max_bytes = max_cache_mb * 1024 * 1024
 
-        index = self._load_index()
         items: List[Tuple[str, str, str]] = []
         for role_name, role_info in index.items():
             if not isinstance(role_info, dict):
@@ -362,39 +363,30 @@ class RoleReferenceStore:
             if rhash:
                 items.append((role_name, rhash, updated_at))
 
-        def _total_size() -> int:
-            total = 0
-            for _, rh, _ in items:
-                role_dir = self._role_dir(rh)
-                if not os.path.isdir(role_dir):
-                    continue
-                for root, _, filenames in os.walk(role_dir):
-                    for fname in filenames:
-                        try:
-                            total += os.path.getsize(os.path.join(root, fname))
-                        except OSError:
-                            continue
-            return total
-
         items.sort(key=lambda x: x[2])
-        total = _total_size()
+        # 每个角色目录只统计一次大小，淘汰时直接扣减
+        sizes = [self._dir_size_bytes(self._role_dir(rh)) for _, rh, _ in items]
+        total = sum(sizes)
 
-        while total > max_bytes and items:
-            role_name, rhash, _ = items.pop(0)
+        for (role_name, rhash, _), size in zip(items, sizes):
+            if total <= max_bytes:
+                break
             shutil.rmtree(self._role_dir(rhash), ignore_errors=True)
             index.pop(role_name, None)
-            total = _total_size()
-
-        self._save_index(index)
+            total -= size
 
-    def _dir_size_mb(self, directory: str) -> float:
+    @staticmethod
+    def _dir_size_bytes(directory: str) -> int:
         total = 0
         if not os.path.isdir(directory):
-            return 0.0
+            return 0
         for root, _, filenames in os.walk(directory):
             for fname in filenames:
                 try:
                     total += os.path.getsize(os.path.join(root, fname))
                 except OSError:
                     continue
-        return total / (1024 * 1024)
+        return total
+
+    def _dir_size_mb(self, directory: str) -> float:
+        return self._dir_size_bytes(directory) / (1024 * 1024)
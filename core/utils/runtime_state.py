@@ -7,8 +7,9 @@
 - 默认模型设置
 - 自动清理长时间不活跃的聊天流状态
 """
+import threading
 import time
-from typing import Dict, Any, Optional, Set
+from typing import Dict, Any, FrozenSet, Optional
 from dataclasses import dataclass, field
 from src.common.logger import get_logger
 
@@ -20,15 +21,15 @@ _STATE_TTL_SECONDS = 24 * 60 * 60
 _CLEANUP_INTERVAL_SECONDS = 30 * 60
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatStreamState:
-    """单个聊天流的状态"""
+    """单个聊天流的状态（使用 __slots__，每个聊天流实例不再携带 __dict__）"""
     # 插件是否启用（None表示使用全局配置）
     plugin_enabled: Optional[bool] = None
-    # 被禁用的模型ID集合
-    disabled_models: Set[str] = field(default_factory=set)
-    # 禁用撤回的模型ID集合
-    recall_disabled_models: Set[str] = field(default_factory=set)
+    # 被禁用的模型ID集合（写时复制的 frozenset，读取方无需拷贝）
+    disabled_models: FrozenSet[str] = frozenset()
+    # 禁用撤回的模型ID集合（写时复制的 frozenset）
+    recall_disabled_models: FrozenSet[str] = frozenset()
     # Action组件默认模型（None表示使用全局配置）
     action_default_model: Optional[str] = None
     # Command组件默认模型（None表示使用全局配置）
@@ -45,38 +46,43 @@ class RuntimeStateManager:
     """运行时状态管理器（单例）
 
     按聊天流ID分别管理状态，所有状态仅在内存中保持，重启后重置。
-    """
+    全局唯一实例为模块级的 runtime_state，请直接使用它而不是再次实例化。
 
-    _instance = None
+    写操作（设置/重置/创建/清理）在 _lock 下进行，读操作直接读取字典与不可变集合，不加锁。
+    """
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._states: Dict[str, ChatStreamState] = {}
-            cls._instance._last_cleanup: float = time.time()
-        return cls._instance
+    def __init__(self):
+        self._states: Dict[str, ChatStreamState] = {}
+        self._last_cleanup: float = time.time()
+        # 可重入锁：setter 内部调用 _get_state 时可能再次进入创建/清理路径
+        self._lock = threading.RLock()
 
     def _get_state(self, chat_id: str) -> ChatStreamState:
         """获取或创建聊天流状态"""
-        if chat_id not in self._states:
-            self._states[chat_id] = ChatStreamState()
-        state = self._states[chat_id]
-        state.last_access = time.time()
-        self._maybe_cleanup()
+        try:
+            state = self._states[chat_id]
+        except KeyError:
+            with self._lock:
+                state = self._states.setdefault(chat_id, ChatStreamState())
+        now = time.time()
+        state.last_access = now
+        self._maybe_cleanup(now)
         return state
 
-    def _maybe_cleanup(self):
+    def _maybe_cleanup(self, now: Optional[float] = None):
         """定期清理长时间不活跃的聊天流状态"""
-        now = time.time()
+        if now is None:
+            now = time.time()
         if now - self._last_cleanup < _CLEANUP_INTERVAL_SECONDS:
             return
-        self._last_cleanup = now
-        expired = [
-            cid for cid, s in self._states.items()
-            if now - s.last_access > _STATE_TTL_SECONDS and not self._has_custom_settings(s)
-        ]
-        for cid in expired:
-            del self._states[cid]
+        with self._lock:
+            self._last_cleanup = now
+            expired = [
+                cid for cid, s in self._states.items()
+                if now - s.last_access > _STATE_TTL_SECONDS and not self._has_custom_settings(s)
+            ]
+            for cid in expired:
+                del self._states[cid]
         if expired:
             logger.debug(f"[RuntimeState] 清理了 {len(expired)} 个不活跃的聊天流状态")
 
@@ -112,15 +118,17 @@ class RuntimeStateManager:
 
     def set_plugin_enabled(self, chat_id: str, enabled: bool) -> None:
         """设置插件启用状态"""
-        state = self._get_state(chat_id)
-        state.plugin_enabled = enabled
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} 插件状态设置为: {enabled}")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.plugin_enabled = enabled
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} 插件状态设置为: {enabled}")
 
     def reset_plugin_enabled(self, chat_id: str) -> None:
         """重置插件启用状态为全局配置"""
-        state = self._get_state(chat_id)
-        state.plugin_enabled = None
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} 插件状态已重置为全局配置")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.plugin_enabled = None
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} 插件状态已重置为全局配置")
 
     # ==================== 模型开关 ====================
 
@@ -131,18 +139,19 @@ class RuntimeStateManager:
 
     def set_model_enabled(self, chat_id: str, model_id: str, enabled: bool) -> None:
         """设置模型启用状态"""
+        with self._lock:
+            state = self._get_state(chat_id)
+            if enabled:
+                state.disabled_models = state.disabled_models - {model_id}
+                logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 已启用")
+            else:
+                state.disabled_models = state.disabled_models | {model_id}
+                logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 已禁用")
+
+    def get_disabled_models(self, chat_id: str) -> FrozenSet[str]:
+        """获取被禁用的模型列表（不可变集合，可直接返回）"""
         state = self._get_state(chat_id)
-        if enabled:
-            state.disabled_models.discard(model_id)
-            logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 已启用")
-        else:
-            state.disabled_models.add(model_id)
-            logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 已禁用")
-
-    def get_disabled_models(self, chat_id: str) -> Set[str]:
-        """获取被禁用的模型列表"""
-        state = self._get_state(chat_id)
-        return state.disabled_models.copy()
+        return state.disabled_models
 
     # ==================== 撤回开关 ====================
 
@@ -164,18 +173,19 @@ class RuntimeStateManager:
 
     def set_recall_enabled(self, chat_id: str, model_id: str, enabled: bool) -> None:
         """设置模型的撤回启用状态"""
+        with self._lock:
+            state = self._get_state(chat_id)
+            if enabled:
+                state.recall_disabled_models = state.recall_disabled_models - {model_id}
+                logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 撤回已启用")
+            else:
+                state.recall_disabled_models = state.recall_disabled_models | {model_id}
+                logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 撤回已禁用")
+
+    def get_recall_disabled_models(self, chat_id: str) -> FrozenSet[str]:
+        """获取撤回被禁用的模型列表（不可变集合，可直接返回）"""
         state = self._get_state(chat_id)
-        if enabled:
-            state.recall_disabled_models.discard(model_id)
-            logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 撤回已启用")
-        else:
-            state.recall_disabled_models.add(model_id)
-            logger.info(f"[RuntimeState] 聊天流 {chat_id} 模型 {model_id} 撤回已禁用")
-
-    def get_recall_disabled_models(self, chat_id: str) -> Set[str]:
-        """获取撤回被禁用的模型列表"""
-        state = self._get_state(chat_id)
-        return state.recall_disabled_models.copy()
+        return state.recall_disabled_models
 
     # ==================== 默认模型 ====================
 
@@ -188,15 +198,17 @@ class RuntimeStateManager:
 
     def set_action_default_model(self, chat_id: str, model_id: str) -> None:
         """设置Action组件的默认模型"""
-        state = self._get_state(chat_id)
-        state.action_default_model = model_id
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} Action默认模型设置为: {model_id}")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.action_default_model = model_id
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} Action默认模型设置为: {model_id}")
 
     def reset_action_default_model(self, chat_id: str) -> None:
         """重置Action组件的默认模型为全局配置"""
-        state = self._get_state(chat_id)
-        state.action_default_model = None
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} Action默认模型已重置为全局配置")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.action_default_model = None
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} Action默认模型已重置为全局配置")
 
     def get_command_default_model(self, chat_id: str, global_default: str) -> str:
         """获取Command组件的默认模型"""
@@ -207,15 +219,17 @@ class RuntimeStateManager:
 
     def set_command_default_model(self, chat_id: str, model_id: str) -> None:
         """设置Command组件的默认模型"""
-        state = self._get_state(chat_id)
-        state.command_default_model = model_id
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} Command默认模型设置为: {model_id}")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.command_default_model = model_id
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} Command默认模型设置为: {model_id}")
 
     def reset_command_default_model(self, chat_id: str) -> None:
         """重置Command组件的默认模型为全局配置"""
-        state = self._get_state(chat_id)
-        state.command_default_model = None
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} Command默认模型已重置为全局配置")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.command_default_model = None
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} Command默认模型已重置为全局配置")
 
     # ==================== 自拍日程开关 ====================
 
@@ -236,15 +250,17 @@ class RuntimeStateManager:
 
     def set_selfie_schedule_enabled(self, chat_id: str, enabled: bool) -> None:
         """设置自拍日程增强启用状态"""
-        state = self._get_state(chat_id)
-        state.selfie_schedule_enabled = enabled
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍日程增强设置为: {enabled}")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.selfie_schedule_enabled = enabled
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍日程增强设置为: {enabled}")
 
     def reset_selfie_schedule_enabled(self, chat_id: str) -> None:
         """重置自拍日程增强为全局配置"""
-        state = self._get_state(chat_id)
-        state.selfie_schedule_enabled = None
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍日程增强已重置为全局配置")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.selfie_schedule_enabled = None
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍日程增强已重置为全局配置")
 
     # ==================== 自拍风格 ====================
 
@@ -267,23 +283,25 @@ class RuntimeStateManager:
 
     def set_selfie_style(self, chat_id: str, style: str) -> None:
         """设置手动自拍默认风格"""
-        state = self._get_state(chat_id)
-        state.selfie_style = style
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍风格设置为: {style}")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.selfie_style = style
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍风格设置为: {style}")
 
     def reset_selfie_style(self, chat_id: str) -> None:
         """重置手动自拍风格为全局配置"""
-        state = self._get_state(chat_id)
-        state.selfie_style = None
-        logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍风格已重置为全局配置")
+        with self._lock:
+            state = self._get_state(chat_id)
+            state.selfie_style = None
+            logger.info(f"[RuntimeState] 聊天流 {chat_id} 自拍风格已重置为全局配置")
 
     # ==================== 状态重置 ====================
 
     def reset_chat_state(self, chat_id: str) -> None:
         """重置指定聊天流的所有状态"""
-        if chat_id in self._states:
-            del self._states[chat_id]
-            logger.info(f"[RuntimeState] 聊天流 {chat_id} 所有状态已重置")
+        with self._lock:
+            if self._states.pop(chat_id, None) is not None:
+                logger.info(f"[RuntimeState] 聊天流 {chat_id} 所有状态已重置")
 
     def get_chat_state_summary(self, chat_id: str) -> Dict[str, Any]:
         """获取聊天流状态摘要"""
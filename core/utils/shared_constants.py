@@ -4,6 +4,9 @@
 # JPEG: /9j/  PNG: iVBORw  WEBP: UklGR  GIF: R0lGOD
 BASE64_IMAGE_PREFIXES = ("iVBORw", "/9j/", "UklGR", "R0lGOD")
 
+# 上述前缀的前 4 个字符，热路径上用 data[:4] in BASE64_IMAGE_MAGIC 做单次哈希判断
+BASE64_IMAGE_MAGIC = frozenset(prefix[:4] for prefix in BASE64_IMAGE_PREFIXES)
+
 # 自拍通用手部质量负面提示词（所有自拍风格共用）
 # 只保留最常用、最有效的 SD 标签，避免重复堆叠。
 SELFIE_HAND_NEGATIVE = "bad hands, extra digits, fewer digits, extra arms, bad anatomy"
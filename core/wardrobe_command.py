@@ -13,6 +13,8 @@ import logging
 
 from src.plugin_system.base.base_command import BaseCommand
 
+from .utils import is_admin_user
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,21 +35,9 @@ class WardrobeCommand(BaseCommand):
     def _check_permission(self) -> bool:
         """检查管理员权限"""
         try:
-            admin_users = self.get_config("components.admin_users", [])
-            user_id = (
-                str(self.message.message_info.user_info.user_id)
-                if self.message and self.message.message_info and self.message.message_info.user_info
-                else None
-            )
-            if user_id is None:
-                return False
-
-            if isinstance(admin_users, list):
-                return user_id in admin_users
-            if isinstance(admin_users, str):
-                normalized = [item.strip() for item in admin_users.split(",") if item.strip()]
-                return user_id in normalized
-            return False
+            user_info = getattr(getattr(self.message, "message_info", None), "user_info", None)
+            user_id = getattr(user_info, "user_id", None)
+            return is_admin_user(self.get_config("components.admin_users", []), user_id)
         except (AttributeError, TypeError, KeyError) as exc:
             logger.debug("权限检查失败: %s", exc)
             return False
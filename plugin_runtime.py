@@ -119,6 +119,9 @@ class PluginRuntimeMixin:
         """插件卸载时停止后台任务。"""
         await self._stop_auto_selfie_task()
         await self._stop_schedule_gen_task()
+        await self._stop_recall_scheduler()
+        await self._close_http_session()
+        self._shutdown_download_executor()
 
     async def _stop_auto_selfie_task(self) -> None:
         """停止自动自拍后台任务，避免重载后残留。"""
@@ -145,5 +148,32 @@ class PluginRuntimeMixin:
         self._schedule_gen_task = None
         self._schedule_pending = False
 
+    async def _stop_recall_scheduler(self) -> None:
+        """停止自动撤回调度任务，丢弃尚未执行的撤回。"""
+        try:
+            from .core.utils.recall_utils import shutdown_recall_scheduler
+
+            await shutdown_recall_scheduler()
+        except Exception as exc:
+            logger.warning("停止自动撤回调度失败: %s", exc, exc_info=True)
+
+    async def _close_http_session(self) -> None:
+        """关闭图片下载共享的 HTTP 会话。"""
+        try:
+            from .core.utils.image_utils import close_http_session
+
+            await close_http_session()
+        except Exception as exc:
+            logger.warning("关闭图片下载会话失败: %s", exc, exc_info=True)
+
+    def _shutdown_download_executor(self) -> None:
+        """关闭图片下载线程池，避免每次重载残留空闲线程。"""
+        try:
+            from .core.utils.image_utils import shutdown_download_executor
+
+            shutdown_download_executor()
+        except Exception as exc:
+            logger.warning("关闭图片下载线程池失败: %s", exc, exc_info=True)
+
 
 __all__ = ["PluginRuntimeMixin"]